@@ -22,52 +22,28 @@ const AdminDashboard = () => {
   useEffect(() => {
     const fetchDashboardData = async () => {
       try {
-        const [
-          guestsRes, 
-          roomsRes, 
-          reservationsRes,
-          availabilityRes,
-          recentGuestsRes,
-          upcomingReservationsRes
-        ] = await Promise.all([
-          fetch('/guests'),
-          fetch('/rooms'),
-          fetch('/reservations'),
-          fetch('/rooms/availability'),
-          fetch('/guests?_sort=created_at&_order=desc&_limit=5'),
-          fetch('/reservations?check_in_date_gte=today&_sort=check_in_date&_order=asc&_limit=5')
-        ]);
-
-        if (!guestsRes.ok || !roomsRes.ok || !reservationsRes.ok) {
+        // One aggregated request instead of downloading every table.
+        const response = await fetch('/dashboard/summary');
+        if (!response.ok) {
           throw new Error('Failed to fetch dashboard data');
         }
-
-        const guests = await guestsRes.json();
-        const rooms = await roomsRes.json();
-        const reservations = await reservationsRes.json();
-        const availability = await availabilityRes.json();
-        const recentGuestsData = await recentGuestsRes.json();
-        const upcomingReservationsData = await upcomingReservationsRes.json();
-
-        const today = new Date().toISOString().split('T')[0];
-        const todayCheckIns = reservations.filter(r => r.check_in_date === today).length;
-        const todayCheckOuts = reservations.filter(r => r.check_out_date === today).length;
+        const summary = await response.json();
 
         setStats({
-          guests: guests.length,
-          rooms: rooms.length,
-          reservations: reservations.length,
-          availableRooms: availability.filter(r => r.available).length,
-          occupiedRooms: availability.filter(r => !r.available).length,
-          maintenanceRooms: rooms.filter(r => r.status === 'maintenance').length,
-          todayCheckIns,
-          todayCheckOuts,
-          revenue: reservations.reduce((sum, r) => sum + (r.room?.price || 0), 0),
-          amenities: rooms.reduce((sum, r) => sum + (r.amenities?.length || 0), 0)
+          guests: summary.guests.total,
+          rooms: summary.rooms.total,
+          reservations: summary.reservations,
+          availableRooms: summary.rooms.vacant,
+          occupiedRooms: summary.rooms.occupied,
+          maintenanceRooms: summary.rooms.by_status.maintenance || 0,
+          todayCheckIns: summary.arrivals.expected,
+          todayCheckOuts: summary.departures.expected,
+          revenue: summary.revenue.month_to_date,
+          amenities: summary.amenities
         });
 
-        setRecentGuests(recentGuestsData);
-        setUpcomingReservations(upcomingReservationsData);
+        setRecentGuests(summary.recent_guests);
+        setUpcomingReservations(summary.upcoming_reservations);
         setLoading(false);
       } catch (err) {
         setError(err.message);
@@ -136,7 +112,7 @@ const AdminDashboard = () => {
         </div>
 
         <div className="stat-card total-revenue">
-          <h3>Total Revenue</h3>
+          <h3>Revenue (Month to Date)</h3>
           <p>${stats.revenue.toLocaleString()}</p>
           <div className="stat-icon">💰</div>
         </div>
@@ -187,8 +163,8 @@ const AdminDashboard = () => {
             <tbody>
               {upcomingReservations.map(res => (
                 <tr key={res.id}>
-                  <td>{res.guest?.name || 'N/A'}</td>
-                  <td>{res.room?.room_number || 'N/A'}</td>
+                  <td>{res.guest || 'N/A'}</td>
+                  <td>{res.room_number || 'N/A'}</td>
                   <td>{new Date(res.check_in_date).toLocaleDateString()}</td>
                   <td>{new Date(res.check_out_date).toLocaleDateString()}</td>
                 </tr>
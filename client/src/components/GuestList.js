@@ -3,6 +3,8 @@ import { Link } from 'react-router-dom';
 import AddGuestForm from './AddGuestForm'; 
 import './GuestList.css';
 
+const PAGE_SIZE = 50;
+
 const GuestList = () => {
   const [guests, setGuests] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -11,18 +13,29 @@ const GuestList = () => {
   const [showAddForm, setShowAddForm] = useState(false);
   const [newGuest, setNewGuest] = useState(null);
 
+  // Typeahead against the server-side index instead of filtering every guest
+  // in the browser; without a search term show the first page.
   useEffect(() => {
-    fetchGuests();
-  }, []);
+    const controller = new AbortController();
+    const timer = setTimeout(() => fetchGuests(searchTerm.trim(), controller.signal), 200);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [searchTerm]);
 
-  const fetchGuests = async () => {
+  const fetchGuests = async (term, signal) => {
     try {
-      const response = await fetch('/guests');
+      const url = term
+        ? `/guests/search?q=${encodeURIComponent(term)}&limit=${PAGE_SIZE}`
+        : `/guests?_limit=${PAGE_SIZE}&expand=`;
+      const response = await fetch(url, { signal });
       if (!response.ok) throw new Error('Failed to fetch guests');
       const data = await response.json();
       setGuests(data);
       setLoading(false);
     } catch (err) {
+      if (err.name === 'AbortError') return;
       setError(err.message);
       setLoading(false);
     }
@@ -35,12 +48,6 @@ const GuestList = () => {
     setTimeout(() => setNewGuest(null), 3000);
   };
 
-  const filteredGuests = guests.filter(guest =>
-    guest.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    guest.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    guest.phone.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
   if (loading) return <div className="loading">Loading guests...</div>;
   if (error) return <div className="error-message">Error: {error}</div>;
 
@@ -93,8 +100,8 @@ const GuestList = () => {
             </tr>
           </thead>
           <tbody>
-            {filteredGuests.length > 0 ? (
-              filteredGuests.map(guest => (
+            {guests.length > 0 ? (
+              guests.map(guest => (
                 <tr key={guest.id}>
                   <td>{guest.name}</td>
                   <td>{guest.email}</td>
@@ -15,6 +15,7 @@ const validationSchema = yup.object({
 
 const NewReservation = () => {
   const [guests, setGuests] = useState([]);
+  const [guestSearch, setGuestSearch] = useState('');
   const [rooms, setRooms] = useState([]);
   const [success, setSuccess] = useState(false);
   const [loading, setLoading] = useState(true);
@@ -59,9 +60,11 @@ const NewReservation = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const guestsRes = await fetch('/guests');
-        const guestsData = await guestsRes.json();
-        setGuests(guestsData);
+        const guestId = searchParams.get('guestId');
+        if (guestId) {
+          const guestRes = await fetch(`/guests/${guestId}?expand=`);
+          if (guestRes.ok) setGuests([await guestRes.json()]);
+        }
 
         const roomsRes = await fetch('/rooms');
         const roomsData = await roomsRes.json();
@@ -74,7 +77,25 @@ const NewReservation = () => {
     };
 
     fetchData();
-  }, []);
+  }, [searchParams]);
+
+  useEffect(() => {
+    const term = guestSearch.trim();
+    if (!term) return;
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      fetch(`/guests/search?q=${encodeURIComponent(term)}&limit=20`, { signal: controller.signal })
+        .then(res => res.json())
+        .then(setGuests)
+        .catch(error => {
+          if (error.name !== 'AbortError') console.error('Error searching guests:', error);
+        });
+    }, 200);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [guestSearch]);
 
   if (loading) return <div className={styles.loading}>Loading...</div>;
 
@@ -85,6 +106,13 @@ const NewReservation = () => {
       <form onSubmit={formik.handleSubmit} className={styles.form}>
         <div className={styles.formGroup}>
           <label className={styles.label}>Guest:</label>
+          <input
+            type="text"
+            placeholder="Search by name, email, phone or ID..."
+            value={guestSearch}
+            onChange={(e) => setGuestSearch(e.target.value)}
+            className={styles.input}
+          />
           <select
             name="guest_id"
             value={formik.values.guest_id}
@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import { Link } from 'react-router-dom';
+import useChangeFeed from './useChangeFeed';
 
 const ReservationList = () => {
   const [reservations, setReservations] = useState([]);
@@ -7,7 +8,7 @@ const ReservationList = () => {
   const [error, setError] = useState(null);
   const [filter, setFilter] = useState('all');
 
-  useEffect(() => {
+  const loadReservations = () =>
     fetch('/reservations')
       .then(res => {
         if (!res.ok) {
@@ -23,7 +24,31 @@ const ReservationList = () => {
         setError(err.message);
         setLoading(false);
       });
-  }, []);
+
+  const upsertReservation = reservation => {
+    setReservations(current => current.some(res => res.id === reservation.id)
+      ? current.map(res => res.id === reservation.id ? reservation : res)
+      : [...current, reservation]);
+  };
+
+  // Apply changes made at other desks instead of reloading the whole list.
+  useChangeFeed(loadReservations, change => {
+    if (change.entity !== 'reservation') return;
+    if (change.op === 'delete') {
+      setReservations(current => current.filter(res => res.id !== change.entity_id));
+      return;
+    }
+    const existing = reservations.find(res => res.id === change.entity_id);
+    if (existing && existing.guest_id === change.data.guest_id && existing.room_id === change.data.room_id) {
+      upsertReservation({ ...existing, ...change.data });
+      return;
+    }
+    // New, or moved to another guest or room: fetch it with its guest and room.
+    fetch(`/reservations/${change.entity_id}`)
+      .then(res => (res.ok ? res.json() : null))
+      .then(reservation => reservation && upsertReservation(reservation))
+      .catch(err => console.error('Error fetching reservation:', err));
+  });
 
   const filteredReservations = reservations.filter(res => {
     if (filter === 'all') return true;
@@ -31,14 +56,19 @@ const ReservationList = () => {
   });
 
   const handleStatusChange = (id, newStatus) => {
+    // The version we last saw, so someone else's newer edit isn't overwritten.
+    const { version } = reservations.find(res => res.id === id);
     fetch(`/reservations/${id}`, {
       method: 'PATCH',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ status: newStatus }),
+      body: JSON.stringify({ status: newStatus, version }),
     })
       .then(res => {
+        if (res.status === 409) {
+          return res.json().then(body => { throw new Error(body.error); });
+        }
         if (!res.ok) {
           throw new Error('Failed to update reservation');
         }
@@ -68,6 +98,7 @@ const ReservationList = () => {
           <option value="checked-in">Checked In</option>
           <option value="checked-out">Checked Out</option>
           <option value="cancelled">Cancelled</option>
+          <option value="no-show">No-show</option>
         </select>
       </div>
       <table>
@@ -97,6 +128,7 @@ const ReservationList = () => {
                   <option value="checked-in">Checked In</option>
                   <option value="checked-out">Checked Out</option>
                   <option value="cancelled">Cancelled</option>
+                  <option value="no-show">No-show</option>
                 </select>
               </td>
               <td>
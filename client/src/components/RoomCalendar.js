@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { format, addDays, startOfWeek } from 'date-fns';
+import useChangeFeed from './useChangeFeed';
 import './RoomCalendar.css';
 
 const RoomCalendar = () => {
@@ -8,50 +9,63 @@ const RoomCalendar = () => {
   const [reservations, setReservations] = useState([]);
   const [loading, setLoading] = useState(true);
 
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const [roomsRes, reservationsRes] = await Promise.all([
-          fetch('/rooms'),
-          fetch('/reservations')
-        ]);
-        
-        const roomsData = await roomsRes.json();
-        const reservationsData = await reservationsRes.json();
-        
-        setRooms(roomsData);
-        setReservations(reservationsData);
-      } catch (error) {
-        console.error('Error fetching data:', error);
-      } finally {
-        setLoading(false);
-      }
-    };
+  const weekStart = startOfWeek(currentDate);
+  const days = Array.from({ length: 7 }, (_, i) => addDays(weekStart, i));
+  const weekKey = format(weekStart, 'yyyy-MM-dd');
+
+  const fetchData = useCallback(async () => {
+    try {
+      const response = await fetch(`/rooms/calendar?start=${weekKey}&days=7`);
+      const calendar = await response.json();
+
+      // Expand each room's run-length encoded nights into one cell per day.
+      setRooms(calendar.rooms.map(room => ({
+        ...room,
+        cells: room.runs.flatMap(([count, booking]) => Array(count).fill(booking))
+      })));
+      setReservations(calendar.reservations);
+    } catch (error) {
+      console.error('Error fetching data:', error);
+    } finally {
+      setLoading(false);
+    }
+  }, [weekKey]);
 
+  useEffect(() => {
     fetchData();
-  }, []);
+  }, [fetchData]);
 
-  const weekStart = startOfWeek(currentDate);
-  const days = Array.from({ length: 7 }, (_, i) => addDays(weekStart, i));
+  // Refresh the week (one compact request) when a change touches it, at most
+  // once per burst of changes.
+  const refreshTimer = useRef(null);
+  useEffect(() => () => clearTimeout(refreshTimer.current), []);
+  useChangeFeed(null, change => {
+    // Bulk imports and resyncs carry no single stay, so they always refresh.
+    if (change.entity === 'reservation' && ['create', 'update', 'delete'].includes(change.op)) {
+      const shown = reservations.some(res => res.id === change.entity_id);
+      if (change.op === 'delete') {
+        if (!shown) return;
+      } else {
+        const weekEnd = format(addDays(weekStart, 7), 'yyyy-MM-dd');
+        const overlaps = change.data.check_in_date.slice(0, 10) < weekEnd
+          && change.data.check_out_date.slice(0, 10) > weekKey;
+        if (!overlaps && !shown) return;
+      }
+    }
+    clearTimeout(refreshTimer.current);
+    refreshTimer.current = setTimeout(fetchData, 300);
+  });
 
-  const getRoomStatus = (roomId, date) => {
-    const dateStr = format(date, 'yyyy-MM-dd');
-    const reservation = reservations.find(res => 
-      res.room_id === roomId && 
-      res.check_in_date <= dateStr && 
-      res.check_out_date >= dateStr &&
-      ['confirmed', 'checked-in'].includes(res.status)
-    );
-    
-    if (reservation) {
+  const getRoomStatus = (room, dayIndex) => {
+    const booking = room.cells[dayIndex];
+    if (booking !== null && booking !== undefined) {
       return {
         status: 'booked',
-        guest: reservation.guest?.name || 'Guest'
+        guest: reservations[booking]?.guest || 'Guest'
       };
     }
     
-    const room = rooms.find(r => r.id === roomId);
-    if (room && room.status === 'maintenance') {
+    if (room.status === 'maintenance') {
       return {
         status: 'maintenance',
         guest: null
@@ -106,8 +120,8 @@ const RoomCalendar = () => {
                 <div>{room.room_number}</div>
                 <div>{room.room_type}</div>
               </td>
-              {days.map(day => {
-                const { status, guest } = getRoomStatus(room.id, day);
+              {days.map((day, dayIndex) => {
+                const { status, guest } = getRoomStatus(room, dayIndex);
                 return (
                   <td key={day.toString()} className={`status-${status}`}>
                     {status === 'booked' ? guest : status}
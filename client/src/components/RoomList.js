@@ -1,4 +1,5 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
+import useChangeFeed from './useChangeFeed';
 
 const RoomList = () => {
   const [rooms, setRooms] = useState([]);
@@ -6,7 +7,7 @@ const RoomList = () => {
   const [error, setError] = useState(null);
   const [filter, setFilter] = useState('all');
 
-  useEffect(() => {
+  const loadRooms = () =>
     fetch('/rooms')
       .then(res => {
         if (!res.ok) {
@@ -22,7 +23,18 @@ const RoomList = () => {
         setError(err.message);
         setLoading(false);
       });
-  }, []);
+
+  // Apply changes made at other desks instead of reloading every room.
+  useChangeFeed(loadRooms, change => {
+    if (change.entity !== 'room') return;
+    if (change.op === 'delete') {
+      setRooms(current => current.filter(room => room.id !== change.entity_id));
+      return;
+    }
+    setRooms(current => current.some(room => room.id === change.entity_id)
+      ? current.map(room => room.id === change.entity_id ? { ...room, ...change.data } : room)
+      : [...current, { amenities: [], ...change.data }]);
+  });
 
   const filteredRooms = rooms.filter(room => {
     if (filter === 'all') return true;
@@ -30,14 +42,19 @@ const RoomList = () => {
   });
 
   const handleStatusChange = (id, newStatus) => {
+    // The version we last saw, so someone else's newer edit isn't overwritten.
+    const { version } = rooms.find(room => room.id === id);
     fetch(`/rooms/${id}`, {
       method: 'PATCH',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ status: newStatus }),
+      body: JSON.stringify({ status: newStatus, version }),
     })
       .then(res => {
+        if (res.status === 409) {
+          return res.json().then(body => { throw new Error(body.error); });
+        }
         if (!res.ok) {
           throw new Error('Failed to update room');
         }
@@ -0,0 +1,116 @@
+import { useEffect, useRef } from 'react';
+
+const POLL_MS = 5000;
+// How long to poll before trying the stream again after being turned away.
+const STREAM_RETRY_MS = 60000;
+
+// Follows /changes/stream for rooms and reservations. `load` (optional)
+// fetches the full data set and `apply` receives every change after it. The
+// cursor is taken before loading, so nothing committed in between is lost;
+// changes already in the load are simply applied again. Bulk imports and
+// expired cursors reload from scratch. When the server has no room for
+// another stream, changes are polled from /changes instead for a while.
+const useChangeFeed = (load, apply) => {
+  const handlers = useRef({ load, apply });
+  handlers.current = { load, apply };
+
+  useEffect(() => {
+    let source = null;
+    let timer = null;
+    let generation = 0;
+    let cursor = 0;
+
+    const stop = () => {
+      if (source) source.close();
+      source = null;
+      clearTimeout(timer);
+    };
+
+    const handle = change => {
+      cursor = Math.max(cursor, change.id);
+      if (change.op === 'bulk') {
+        reload(change);
+      } else {
+        handlers.current.apply(change);
+      }
+    };
+
+    const listen = run => {
+      source = new EventSource(`/changes/stream?since=${cursor}`);
+      source.addEventListener('change', event => handle(JSON.parse(event.data)));
+      source.addEventListener('resync', event => {
+        cursor = JSON.parse(event.data).cursor;
+        reload({ op: 'resync' });
+      });
+      source.addEventListener('error', () => {
+        // EventSource reconnects by itself after a dropped connection, but
+        // gives up on an error response such as the 503 sent when every
+        // stream slot is taken.
+        if (run === generation && source && source.readyState === EventSource.CLOSED) {
+          source = null;
+          poll(run, Date.now() + STREAM_RETRY_MS);
+        }
+      });
+    };
+
+    const poll = (run, until) => {
+      timer = setTimeout(async () => {
+        if (run !== generation) return;
+        if (Date.now() >= until) {
+          listen(run);
+          return;
+        }
+        try {
+          const res = await fetch(`/changes?since=${cursor}`);
+          const body = await res.json();
+          if (run !== generation) return;
+          if (res.status === 410) {
+            cursor = body.cursor;
+            reload({ op: 'resync' });
+          } else {
+            for (const change of body.changes) {
+              handle(change);
+              if (run !== generation) return;
+            }
+            cursor = Math.max(cursor, body.cursor);
+          }
+        } catch (error) {
+          console.error('Error polling changes:', error);
+        }
+        if (run === generation) poll(run, until);
+      }, POLL_MS);
+    };
+
+    const start = async () => {
+      const run = ++generation;
+      stop();
+      try {
+        const res = await fetch('/changes');
+        const { cursor: latest } = await res.json();
+        if (handlers.current.load) await handlers.current.load();
+        if (run !== generation) return;
+        cursor = latest;
+        listen(run);
+      } catch (error) {
+        console.error('Error following changes:', error);
+      }
+    };
+
+    // Without a loader the caller refreshes itself on 'bulk' and 'resync'.
+    const reload = change => {
+      if (handlers.current.load) {
+        start();
+      } else {
+        handlers.current.apply(change);
+      }
+    };
+
+    start();
+    return () => {
+      generation++;
+      stop();
+    };
+  }, []);
+};
+
+export default useChangeFeed;
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from itertools import accumulate
+from sqlalchemy import func, select
+from config import db
+from models import Room, DailyOccupancy
+
+GRANULARITIES = ('day', 'month')
+MAX_REPORT_DAYS = 3660
+
+
+def _metrics(rooms, available, sold, revenue):
+    return {
+        'rooms': rooms,
+        'available_nights': available,
+        'sold_nights': sold,
+        'revenue': round(revenue, 2),
+        'occupancy': round(sold / available, 4) if available else None,
+        'adr': round(revenue / sold, 2) if sold else None,
+        'revpar': round(revenue / available, 2) if available else None,
+    }
+
+
+def revenue_report(start, end, granularity='month', room_types=None):
+    """Occupancy, ADR and RevPAR per room type for each day or month in ``[start, end)``.
+
+    ADR is revenue per night sold and RevPAR revenue per available room
+    night, priced at each room's current rate. Every room counts as available
+    every night, and ``room_type`` ``"all"`` rows total the types.
+    """
+    days = (end - start).days
+    counts = select(Room.room_type, func.count()).group_by(Room.room_type)
+    if room_types:
+        counts = counts.where(Room.room_type.in_(room_types))
+    rooms = dict(db.session.execute(counts).all())
+
+    # Nights sold and revenue per night come precomputed from daily_occupancy.
+    nights = {room_type: [0] * days for room_type in rooms}
+    revenue = {room_type: [0] * days for room_type in rooms}
+    query = (
+        select(DailyOccupancy.day, DailyOccupancy.room_type, DailyOccupancy.nights_sold, DailyOccupancy.revenue_cents)
+        .where(DailyOccupancy.day >= start, DailyOccupancy.day < end)
+    )
+    if room_types:
+        query = query.where(DailyOccupancy.room_type.in_(room_types))
+    for day, room_type, sold, cents in db.session.execute(query):
+        if room_type in nights:
+            nights[room_type][(day - start).days] = sold
+            revenue[room_type][(day - start).days] = cents
+
+    # Running totals so any span of days sums in constant time.
+    cumulative = {}
+    for room_type in rooms:
+        cumulative[room_type] = (
+            list(accumulate(nights[room_type], initial=0)),
+            list(accumulate(revenue[room_type], initial=0)),
+        )
+
+    buckets = {}
+    for index in range(days):
+        day = start + timedelta(days=index)
+        label = day.isoformat() if granularity == 'day' else day.strftime('%Y-%m')
+        buckets.setdefault(label, [index, index])[1] = index + 1
+
+    rows = []
+    for label, (lo, hi) in buckets.items():
+        totals = [0, 0, 0, 0.0]
+        for room_type in sorted(rooms):
+            sold, earned = cumulative[room_type]
+            values = (rooms[room_type], rooms[room_type] * (hi - lo), sold[hi] - sold[lo], (earned[hi] - earned[lo]) / 100)
+            rows.append({'period': label, 'room_type': room_type, **_metrics(*values)})
+            totals = [total + value for total, value in zip(totals, values)]
+        rows.append({'period': label, 'room_type': 'all', **_metrics(*totals)})
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'rows': rows,
+    }
@@ -1,11 +1,113 @@
 from flask import Flask, jsonify, request, make_response, session
 from flask_restful import Resource, Api
 from config import app, db, api
-from models import Guest, Room, Reservation, Amenity, Staff
+from models import Guest, Room, Reservation, Amenity, Staff, CacheGeneration
+from availability import room_availability, search_rooms
+from guest_search import search_guests, SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from booking import commit_booking, BookingConflict, RoomNotFound, VersionConflict
+from bulk import parse_records, import_guests, import_reservations, update_rooms, update_reservations
+from occupancy import occupancy_calendar, MAX_CALENDAR_DAYS
+from analytics import revenue_report, GRANULARITIES, MAX_REPORT_DAYS
+from dashboard import dashboard_summary
+import daily_occupancy
+from changes import change_feed, CursorExpired, CHANGES_LIMIT, MAX_CHANGES_LIMIT, STREAM_RETRY_AFTER
+from sweeps import Scheduler, sweep_stats
+from querying import ListQuery
+from loading import guest_profile, room_profile, reservation_profile
+from auth import identity_cache, burn_password_check
+from cache import response_cache
+from serializers import guest_serializer, room_serializer, reservation_serializer, amenity_serializer
 from werkzeug.security import check_password_hash
+from sqlalchemy import func
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime
 from flask_session import Session
+import click
+import json
 import os
+import signal
+import threading
+
+guest_list = ListQuery(Guest, ['id', 'name', 'email', 'phone', 'id_type', 'id_number', 'created_at', 'updated_at'])
+room_list = ListQuery(Room, ['id', 'room_number', 'room_type', 'price', 'capacity', 'status'])
+reservation_list = ListQuery(Reservation, ['id', 'guest_id', 'room_id', 'check_in_date', 'check_out_date', 'status'])
+amenity_list = ListQuery(Amenity, ['id', 'name'])
+room_search = ListQuery(Room, ['id', 'room_number', 'room_type', 'price', 'capacity', 'status'], default_sort='price')
+
+identity_cache.init_app(app, db, Staff)
+daily_occupancy.init_occupancy_tracking()
+change_feed.init_app(app, db)
+response_cache.init_app(app, db, CacheGeneration.__table__)
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+def _staff_identity(staff_id):
+    staff = Staff.query.get(staff_id)
+    return staff.to_dict() if staff else None
+
+def _bulk_response(importer):
+    try:
+        records, errors = parse_records(request)
+    except ValueError as e:
+        return make_response({'error': str(e)}, 400)
+    try:
+        created, errors = importer(records, errors)
+    except Exception as e:
+        return make_response({'error': str(e)}, 400)
+    status = 201 if not errors else (207 if created else 400)
+    return make_response(jsonify({'created': created, 'errors': errors}), status)
+
+def _bulk_update_response(updater):
+    try:
+        records, errors = parse_records(request)
+    except ValueError as e:
+        return make_response({'error': str(e)}, 400)
+    try:
+        updated, conflicts, errors = updater(records, errors)
+    except Exception as e:
+        return make_response({'error': str(e)}, 400)
+    if not (conflicts or errors):
+        status = 200
+    else:
+        status = 207 if updated else (409 if conflicts else 400)
+    return make_response(jsonify({'updated': updated, 'conflicts': conflicts, 'errors': errors}), status)
+
+def _stay_window():
+    """Parse ``check_in``/``check_out`` into ``(start, end)``, or ``(None, None)`` when absent."""
+    check_in_str = request.args.get('check_in')
+    check_out_str = request.args.get('check_out')
+    if not (check_in_str or check_out_str):
+        return None, None
+    if not (check_in_str and check_out_str):
+        raise ValueError('Both check_in and check_out are required')
+    try:
+        start, end = _parse_date(check_in_str), _parse_date(check_out_str)
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+    if end <= start:
+        raise ValueError('check_out must be after check_in')
+    return start, end
+
+def _cursor(value):
+    if value is None or value == '':
+        return None
+    cursor = int(value)
+    if cursor < 0:
+        raise ValueError
+    return cursor
+
+def _list_arg(name):
+    values = []
+    for value in request.args.getlist(name):
+        values.extend(v.strip() for v in value.split(',') if v.strip())
+    return values
 
 @app.route('/')
 def home():
@@ -13,8 +115,12 @@ def home():
 
 class Guests(Resource):
     def get(self):
-        guests = [guest.to_dict() for guest in Guest.query.all()]
-        return guests, 200
+        try:
+            expand = guest_profile.parse(request.args)
+            rows, headers = guest_list.apply(guest_serializer.statement(), request.args, request.base_url)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        return guest_serializer.response(rows, expand, headers=headers, ndjson=_wants_ndjson())
     
     def post(self):
         data = request.get_json()
@@ -25,7 +131,7 @@ class Guests(Resource):
         if missing_fields:
             return {'error': f'Missing required fields: {", ".join(missing_fields)}'}, 400
         
-        if Guest.query.filter_by(email=data['email']).first():
+        if Guest.query.filter(func.lower(Guest.email) == func.lower(data['email'])).first():
             return {'error': 'Email already exists'}, 400
         
         try:
@@ -45,12 +151,40 @@ class Guests(Resource):
             db.session.rollback()
             return {'error': str(e)}, 400 
 
+class GuestSearch(Resource):
+    # Typeahead results are the guests themselves, without their stays.
+    DEFAULT_EXPAND = frozenset()
+
+    def get(self):
+        try:
+            limit = int(request.args.get('limit', SEARCH_LIMIT))
+        except ValueError:
+            return make_response({'error': 'limit must be an integer'}, 400)
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            return make_response({'error': f'limit must be between 1 and {MAX_SEARCH_LIMIT}'}, 400)
+        try:
+            expand = guest_profile.parse(request.args)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        if expand is None:
+            expand = self.DEFAULT_EXPAND
+        query = search_guests(guest_serializer.statement(), request.args.get('q'), limit)
+        return guest_serializer.response(db.session.execute(query).all(), expand)
+
+class GuestsBulk(Resource):
+    def post(self):
+        return _bulk_response(import_guests)
+
 class GuestById(Resource):
     def get(self, id):
-        guest = Guest.query.get(id)
+        try:
+            expand = guest_profile.parse(request.args)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        guest = Guest.query.options(*guest_profile.options(expand)).get(id)
         if not guest:
             return make_response({'error': 'Guest not found'}, 404)
-        return make_response(jsonify(guest.to_dict())), 200
+        return make_response(jsonify(guest_profile.serialize(guest, expand)), 200)
     
     def patch(self, id):
         guest = Guest.query.get(id)
@@ -76,9 +210,14 @@ class GuestById(Resource):
         return make_response({}, 204)
 
 class Rooms(Resource):
+    @response_cache.cached(lambda: room_serializer.tables(room_profile.parse(request.args)))
     def get(self):
-        rooms = [room.to_dict() for room in Room.query.all()]
-        return make_response(jsonify(rooms), 200)
+        try:
+            expand = room_profile.parse(request.args)
+            rows, headers = room_list.apply(room_serializer.statement(), request.args, request.base_url)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        return room_serializer.response(rows, expand, headers=headers, ndjson=_wants_ndjson())
     
     def post(self):
         data = request.get_json()
@@ -98,10 +237,14 @@ class Rooms(Resource):
 
 class RoomById(Resource):
     def get(self, id):
-        room = Room.query.get(id)
+        try:
+            expand = room_profile.parse(request.args)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        room = Room.query.options(*room_profile.options(expand)).get(id)
         if not room:
             return make_response({'error': 'Room not found'}, 404)
-        return make_response(jsonify(room.to_dict()), 200)
+        return make_response(jsonify(room_profile.serialize(room, expand)), 200)
     
     def patch(self, id):
         room = Room.query.get(id)
@@ -109,12 +252,20 @@ class RoomById(Resource):
             return make_response({'error': 'Room not found'}, 404)
         
         data = request.get_json()
+        # Optional: without it the last write wins, as before.
+        version = data.pop('version', None)
+        if version is not None and version != room.version:
+            return make_response({'error': 'Room has changed since you loaded it', 'version': room.version}, 409)
         try:
             for attr in data:
                 setattr(room, attr, data[attr])
             db.session.commit()
             return make_response(jsonify(room.to_dict()), 200)
+        except StaleDataError:
+            db.session.rollback()
+            return make_response({'error': 'Room was changed by another request'}, 409)
         except Exception as e:
+            db.session.rollback()
             return make_response({'error': str(e)}, 400)
     
     def delete(self, id):
@@ -122,18 +273,27 @@ class RoomById(Resource):
         if not room:
             return make_response({'error': 'Room not found'}, 404)
         
-        db.session.delete(room)
-        db.session.commit()
+        try:
+            db.session.delete(room)
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            return make_response({'error': 'Room was changed by another request'}, 409)
         return make_response({}, 204)
 
 class Reservations(Resource):
     def get(self):
-        reservations = [res.to_dict() for res in Reservation.query.all()]
-        return make_response(jsonify(reservations), 200)
+        try:
+            expand = reservation_profile.parse(request.args)
+            rows, headers = reservation_list.apply(reservation_serializer.statement(), request.args, request.base_url)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        return reservation_serializer.response(rows, expand, headers=headers, ndjson=_wants_ndjson())
     
     def post(self):
         data = request.get_json()
-        try:
+
+        def stage():
             reservation = Reservation(
                 guest_id=data['guest_id'],
                 room_id=data['room_id'],
@@ -143,17 +303,39 @@ class Reservations(Resource):
                 special_requests=data.get('special_requests')
             )
             db.session.add(reservation)
-            db.session.commit()
+            return reservation
+
+        try:
+            reservation = commit_booking(stage)
             return make_response(jsonify(reservation.to_dict()), 201)
+        except BookingConflict as e:
+            return make_response({'error': str(e), 'conflicts': e.conflicts}, 409)
+        except RoomNotFound as e:
+            return make_response({'error': str(e)}, 404)
         except Exception as e:
             return make_response({'error': str(e)}, 400)
 
+class RoomsBulk(Resource):
+    def patch(self):
+        return _bulk_update_response(update_rooms)
+
+class ReservationsBulk(Resource):
+    def post(self):
+        return _bulk_response(import_reservations)
+
+    def patch(self):
+        return _bulk_update_response(update_reservations)
+
 class ReservationById(Resource):
     def get(self, id):
-        reservation = Reservation.query.get(id)
+        try:
+            expand = reservation_profile.parse(request.args)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        reservation = Reservation.query.options(*reservation_profile.options(expand)).get(id)
         if not reservation:
             return make_response({'error': 'Reservation not found'}, 404)
-        return make_response(jsonify(reservation.to_dict()), 200)
+        return make_response(jsonify(reservation_profile.serialize(reservation, expand)), 200)
     
     def patch(self, id):
         reservation = Reservation.query.get(id)
@@ -161,14 +343,33 @@ class ReservationById(Resource):
             return make_response({'error': 'Reservation not found'}, 404)
         
         data = request.get_json()
-        try:
+        version = data.pop('version', None)
+
+        def stage():
+            # Reload rather than reuse the copy read before the write lock was
+            # taken, so the version is checked against current state; a retry
+            # starts from a fresh transaction.
+            reservation = db.session.get(Reservation, id, populate_existing=True)
+            if version is not None and version != reservation.version:
+                raise VersionConflict(reservation.version)
             for attr in data:
                 if attr in ['check_in_date', 'check_out_date']:
                     setattr(reservation, attr, datetime.fromisoformat(data[attr]))
                 else:
                     setattr(reservation, attr, data[attr])
-            db.session.commit()
+            return reservation
+
+        try:
+            reservation = commit_booking(stage)
             return make_response(jsonify(reservation.to_dict()), 200)
+        except BookingConflict as e:
+            return make_response({'error': str(e), 'conflicts': e.conflicts}, 409)
+        except VersionConflict as e:
+            return make_response({'error': 'Reservation has changed since you loaded it', 'version': e.version}, 409)
+        except StaleDataError:
+            return make_response({'error': 'Reservation was changed by another request'}, 409)
+        except RoomNotFound as e:
+            return make_response({'error': str(e)}, 404)
         except Exception as e:
             return make_response({'error': str(e)}, 400)
     
@@ -177,14 +378,22 @@ class ReservationById(Resource):
         if not reservation:
             return make_response({'error': 'Reservation not found'}, 404)
         
-        db.session.delete(reservation)
-        db.session.commit()
+        try:
+            db.session.delete(reservation)
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            return make_response({'error': 'Reservation was changed by another request'}, 409)
         return make_response({}, 204)
 
 class Amenities(Resource):
+    @response_cache.cached(amenity_serializer.tables())
     def get(self):
-        amenities = [amenity.to_dict() for amenity in Amenity.query.all()]
-        return make_response(jsonify(amenities), 200)
+        try:
+            rows, headers = amenity_list.apply(amenity_serializer.statement(), request.args, request.base_url)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        return amenity_serializer.response(rows, headers=headers, ndjson=_wants_ndjson())
     
     def post(self):
         data = request.get_json()
@@ -204,7 +413,13 @@ class StaffLogin(Resource):
         data = request.get_json()
         staff = Staff.query.filter_by(email=data['email']).first()
         
-        if staff and staff.check_password(data['password']):
+        if staff is None:
+            burn_password_check(data['password'])
+        elif staff.check_password(data['password']):
+            if staff.needs_rehash():
+                staff.set_password(data['password'])
+                db.session.commit()
+            session.permanent = True
             session['staff_id'] = staff.id
             return make_response(jsonify(staff.to_dict()), 200)
         return make_response({'error': 'Invalid email or password'}, 401)
@@ -266,45 +481,161 @@ class CheckAuth(Resource):
     def get(self):
         staff_id = session.get('staff_id')
         if staff_id:
-            staff = Staff.query.get(staff_id)
-            if staff:
-                return make_response(jsonify(staff.to_dict()), 200)
+            identity = identity_cache.get(staff_id, _staff_identity)
+            if identity:
+                return make_response(jsonify(identity), 200)
         return make_response({'error': 'Unauthorized'}, 401)
 
 class RoomAvailability(Resource):
+    @response_cache.cached(['rooms', 'reservations', 'room_amenities', 'amenities'])
     def get(self):
         date_str = request.args.get('date')
         try:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now().date()
+            start, end = _stay_window()
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        if start is None:
+            try:
+                start = _parse_date(date_str) if date_str else datetime.now().date()
+            except ValueError:
+                return make_response({'error': 'Invalid date format. Use YYYY-MM-DD'}, 400)
+
+        capacity = request.args.get('capacity')
+        if capacity is not None:
+            try:
+                capacity = int(capacity)
+            except ValueError:
+                return make_response({'error': 'capacity must be an integer'}, 400)
+
+        availability = room_availability(
+            start,
+            end,
+            room_type=_list_arg('room_type'),
+            capacity=capacity,
+            amenities=_list_arg('amenity'),
+        )
+        return make_response(jsonify(availability), 200)
+
+class RoomSearch(Resource):
+    # Results carry their amenities but not each room's booking history.
+    DEFAULT_EXPAND = frozenset({'amenities'})
+
+    @classmethod
+    def expand(cls):
+        expand = room_profile.parse(request.args)
+        return cls.DEFAULT_EXPAND if expand is None else expand
+
+    @response_cache.cached(lambda: room_serializer.tables(RoomSearch.expand())
+                           | {'reservations', 'room_amenities', 'amenities'})
+    def get(self):
+        try:
+            start, end = _stay_window()
+            expand = self.expand()
+            query = search_rooms(room_serializer.statement(), start, end, amenities=_list_arg('amenity'))
+            rows, headers = room_search.apply(query, request.args, request.base_url)
+        except ValueError as e:
+            return make_response({'error': str(e)}, 400)
+        return room_serializer.response(rows, expand, headers=headers, ndjson=_wants_ndjson())
+
+class RoomCalendar(Resource):
+    def get(self):
+        start_str = request.args.get('start')
+        try:
+            start = _parse_date(start_str) if start_str else datetime.now().date()
         except ValueError:
             return make_response({'error': 'Invalid date format. Use YYYY-MM-DD'}, 400)
-        
-        rooms = Room.query.all()
-        availability = []
-        
-        for room in rooms:
-            conflicting_reservations = Reservation.query.filter(
-                Reservation.room_id == room.id,
-                Reservation.check_in_date <= date,
-                Reservation.check_out_date > date,
-                Reservation.status.in_(['confirmed', 'checked-in'])
-            ).count()
-            
-            availability.append({
-                'room_id': room.id,
-                'room_number': room.room_number,
-                'room_type': room.room_type,
-                'available': conflicting_reservations == 0 and room.status == 'available',
-                'status': room.status
-            })
-        
-        return make_response(jsonify(availability), 200)
+        try:
+            days = int(request.args.get('days', 7))
+            room_ids = [int(v) for v in _list_arg('room_id')]
+        except ValueError:
+            return make_response({'error': 'days and room_id must be integers'}, 400)
+        if not 1 <= days <= MAX_CALENDAR_DAYS:
+            return make_response({'error': f'days must be between 1 and {MAX_CALENDAR_DAYS}'}, 400)
+
+        return make_response(jsonify(occupancy_calendar(start, days, room_ids)), 200)
+
+class RevenueAnalytics(Resource):
+    @response_cache.cached(['rooms', 'daily_occupancy'])
+    def get(self):
+        today = datetime.now().date()
+        try:
+            start = _parse_date(request.args['start']) if 'start' in request.args else today.replace(month=1, day=1)
+            end = _parse_date(request.args['end']) if 'end' in request.args else None
+        except ValueError:
+            return make_response({'error': 'Invalid date format. Use YYYY-MM-DD'}, 400)
+        if end is None:
+            # A year on, with Feb 29 ending on Feb 28.
+            end = start.replace(year=start.year + 1, day=28 if (start.month, start.day) == (2, 29) else start.day)
+        if not 0 < (end - start).days <= MAX_REPORT_DAYS:
+            return make_response({'error': f'end must be after start and at most {MAX_REPORT_DAYS} days later'}, 400)
+        granularity = request.args.get('granularity', 'month')
+        if granularity not in GRANULARITIES:
+            return make_response({'error': f'granularity must be one of {", ".join(GRANULARITIES)}'}, 400)
+        report = revenue_report(start, end, granularity, room_types=_list_arg('room_type'))
+        return make_response(jsonify(report), 200)
+
+class DashboardSummary(Resource):
+    @response_cache.cached((), ttl=app.config['DASHBOARD_CACHE_TTL'])
+    def get(self):
+        return make_response(jsonify(dashboard_summary(datetime.now().date())), 200)
+
+class Changes(Resource):
+    def get(self):
+        try:
+            since = _cursor(request.args.get('since'))
+            limit = int(request.args.get('limit', CHANGES_LIMIT))
+        except ValueError:
+            return make_response({'error': 'since and limit must be non-negative integers'}, 400)
+        if not 1 <= limit <= MAX_CHANGES_LIMIT:
+            return make_response({'error': f'limit must be between 1 and {MAX_CHANGES_LIMIT}'}, 400)
+        if since is None:
+            # Where to start from after loading the collections themselves.
+            return make_response(jsonify({'changes': [], 'cursor': change_feed.latest(), 'more': False}), 200)
+        try:
+            changes = change_feed.read(since, limit + 1)
+        except CursorExpired:
+            return make_response({
+                'error': 'Changes since this cursor are no longer kept; reload and start from the new cursor',
+                'cursor': change_feed.latest(),
+            }, 410)
+        more = len(changes) > limit
+        changes = changes[:limit]
+        cursor = changes[-1]['id'] if changes else since
+        return make_response(jsonify({'changes': changes, 'cursor': cursor, 'more': more}), 200)
+
+class ChangeStream(Resource):
+    def get(self):
+        try:
+            # EventSource sends Last-Event-ID by itself when it reconnects.
+            since = _cursor(request.headers.get('Last-Event-ID') or request.args.get('since'))
+        except ValueError:
+            return make_response({'error': 'since must be a non-negative integer'}, 400)
+        if not change_feed.reserve():
+            # Every stream pins a worker thread; past the limit clients poll /changes.
+            response = make_response({'error': 'Too many open change streams; poll /changes instead'}, 503)
+            response.headers['Retry-After'] = str(STREAM_RETRY_AFTER)
+            return response
+        response = app.response_class(
+            change_feed.subscribe(since),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+        response.call_on_close(change_feed.release)
+        return response
+
+class Sweeps(Resource):
+    def get(self):
+        return make_response(jsonify({'sweeps': sweep_stats()}), 200)
 
 api.add_resource(Guests, '/guests')
+api.add_resource(GuestsBulk, '/guests/bulk')
+api.add_resource(GuestSearch, '/guests/search')
 api.add_resource(GuestById, '/guests/<int:id>')
 api.add_resource(Rooms, '/rooms')
+api.add_resource(RoomsBulk, '/rooms/bulk')
 api.add_resource(RoomById, '/rooms/<int:id>')
 api.add_resource(Reservations, '/reservations')
+api.add_resource(ReservationsBulk, '/reservations/bulk')
 api.add_resource(ReservationById, '/reservations/<int:id>')
 api.add_resource(Amenities, '/amenities')
 api.add_resource(StaffLogin, '/staff/login')
@@ -312,6 +643,33 @@ api.add_resource(StaffSignup, '/staff/signup')
 api.add_resource(StaffLogout, '/staff/logout')
 api.add_resource(CheckAuth, '/staff/check-auth')
 api.add_resource(RoomAvailability, '/rooms/availability')
+api.add_resource(RoomSearch, '/rooms/search')
+api.add_resource(RoomCalendar, '/rooms/calendar')
+api.add_resource(RevenueAnalytics, '/analytics/revenue')
+api.add_resource(DashboardSummary, '/dashboard/summary')
+api.add_resource(Changes, '/changes')
+api.add_resource(ChangeStream, '/changes/stream')
+api.add_resource(Sweeps, '/sweeps')
+
+@app.cli.command('rebuild-occupancy')
+def rebuild_occupancy():
+    """Recompute the daily occupancy summary from all reservations."""
+    print(f'Rebuilt daily occupancy: {daily_occupancy.rebuild()} rows')
+
+@app.cli.command('run-sweeps')
+@click.option('--once', is_flag=True, help='Run every sweep once and exit.')
+def run_sweeps(once):
+    """Run the reservation lifecycle sweeps every SWEEP_INTERVAL seconds."""
+    scheduler = Scheduler(app, report=lambda run: print(json.dumps(run), flush=True))
+    if once:
+        scheduler.run_once()
+        return
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        scheduler.run(stop)
+    except KeyboardInterrupt:
+        stop.set()
 
 if __name__ == '__main__':
     app.run(port=5555, debug=True)
\ No newline at end of file
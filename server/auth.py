@@ -0,0 +1,105 @@
+import threading
+import time
+from functools import lru_cache
+from flask import current_app
+from sqlalchemy import event
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+def normalize_method(method):
+    """Spell a werkzeug hash method the way it is stored, e.g. ``pbkdf2:sha256:260000``."""
+    parts = method.split(':')
+    if parts[0] != 'pbkdf2':
+        return method
+    digest = parts[1] if len(parts) > 1 else 'sha256'
+    iterations = parts[2] if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+    return f'pbkdf2:{digest}:{iterations}'
+
+
+def password_method():
+    return normalize_method(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=password_method())
+
+
+def needs_rehash(password_hash):
+    """Whether ``password_hash`` was made with other parameters than the configured ones."""
+    return password_hash.split('$', 1)[0] != password_method()
+
+
+@lru_cache(maxsize=None)
+def _dummy_hash(method):
+    return generate_password_hash('not a password', method=method)
+
+
+def burn_password_check(password):
+    """Spend as long as a real check does, for logins with an unknown email.
+
+    Without this a missing account answers immediately, which tells an
+    attacker which emails belong to staff.
+    """
+    check_password_hash(_dummy_hash(password_method()), password)
+
+
+class IdentityCache:
+    """Serialized staff records for ``check-auth``, kept for ``ttl`` seconds.
+
+    Entries are dropped as soon as a session commits an update to or deletion
+    of that staff member, so role and profile changes show up on the next
+    request. Another process's changes are picked up when the TTL runs out.
+    """
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+        # Bumped on every invalidation so a load that raced a commit isn't stored.
+        self.generation = 0
+
+    def init_app(self, app, db, model):
+        self.ttl = app.config.get('AUTH_CACHE_TTL', self.ttl)
+
+        @event.listens_for(db.session, 'after_flush')
+        def collect_staff_changes(session, flush_context):
+            changed = [obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, model)]
+            if changed:
+                session.info.setdefault('changed_staff', set()).update(changed)
+
+        @event.listens_for(db.session, 'after_commit')
+        def invalidate_staff(session):
+            self.invalidate(session.info.pop('changed_staff', ()))
+
+        @event.listens_for(db.session, 'after_rollback')
+        def discard_staff_changes(session):
+            session.info.pop('changed_staff', None)
+
+    def get(self, staff_id, load):
+        """Return the cached identity for ``staff_id``, calling ``load`` on a miss."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(staff_id)
+            generation = self.generation
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        identity = load(staff_id)
+        if identity is not None and self.ttl > 0:
+            with self.lock:
+                if generation != self.generation:
+                    return identity
+                if len(self.entries) >= self.max_entries:
+                    self.entries = {k: v for k, v in self.entries.items() if v[0] > now}
+                if len(self.entries) < self.max_entries:
+                    self.entries[staff_id] = (now + self.ttl, identity)
+        return identity
+
+    def invalidate(self, staff_ids):
+        with self.lock:
+            self.generation += 1
+            for staff_id in staff_ids:
+                self.entries.pop(staff_id, None)
+
+
+identity_cache = IdentityCache()
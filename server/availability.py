@@ -0,0 +1,113 @@
+from datetime import date, datetime
+from sqlalchemy import and_, exists, func, select
+from config import db
+from models import Room, Reservation, Amenity, room_amenities
+
+# Reservation statuses that hold a room.
+ACTIVE_STATUSES = ('confirmed', 'checked-in')
+
+
+def _midnight(value):
+    # SQLite stores DateTime as text, where '2024-05-10 00:00:00' sorts after
+    # '2024-05-10'; compare plain dates as datetimes so check-out day is free.
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, datetime.min.time())
+    return value
+
+
+def overlap_clause(start, end=None, room_id=None):
+    """Predicate matching active reservations that occupy a room in a window.
+
+    With only ``start`` the window is the single night ``start`` (the guest has
+    checked in on or before it and checks out after it). With ``end`` the
+    window is the half-open range ``[start, end)``.
+    """
+    start, end = _midnight(start), _midnight(end)
+    if end is None:
+        dates = and_(
+            Reservation.check_in_date <= start,
+            Reservation.check_out_date > start,
+        )
+    else:
+        dates = and_(
+            Reservation.check_in_date < end,
+            Reservation.check_out_date > start,
+        )
+    clause = and_(dates, Reservation.status.in_(ACTIVE_STATUSES))
+    if room_id is not None:
+        clause = and_(Reservation.room_id == room_id, clause)
+    return clause
+
+
+def rooms_with_amenities(amenities):
+    """Subquery of room ids that have every amenity named in ``amenities``."""
+    names = set(amenities)
+    return (
+        select(room_amenities.c.room_id)
+        .join(Amenity, Amenity.id == room_amenities.c.amenity_id)
+        .where(Amenity.name.in_(names))
+        .group_by(room_amenities.c.room_id)
+        .having(func.count(func.distinct(Amenity.id)) == len(names))
+    )
+
+
+def filter_rooms(query, room_type=None, capacity=None, amenities=None):
+    """Apply the room_type / capacity / amenity filters shared by room lookups."""
+    if room_type:
+        query = query.where(Room.room_type.in_(room_type))
+    if capacity is not None:
+        query = query.where(Room.capacity >= capacity)
+    if amenities:
+        query = query.where(Room.id.in_(rooms_with_amenities(amenities)))
+    return query
+
+
+def availability_query(start, end=None, room_type=None, capacity=None, amenities=None):
+    """Build the SELECT behind ``room_availability``."""
+    booked = exists().where(overlap_clause(start, end, room_id=Room.id))
+    query = select(
+        Room.id,
+        Room.room_number,
+        Room.room_type,
+        Room.status,
+        booked.label('booked'),
+    ).order_by(Room.id)
+    return filter_rooms(query, room_type, capacity, amenities)
+
+
+def room_availability(start, end=None, room_type=None, capacity=None, amenities=None):
+    """Return the availability of every matching room in one query.
+
+    A room is available when its own status is 'available' and no active
+    reservation overlaps the window described by ``start``/``end`` (see
+    ``overlap_clause``). ``room_type`` and ``amenities`` are iterables of
+    names; ``capacity`` is a minimum number of guests.
+    """
+    query = availability_query(start, end, room_type, capacity, amenities)
+    return [
+        {
+            'room_id': row.id,
+            'room_number': row.room_number,
+            'room_type': row.room_type,
+            'available': not row.booked and row.status == 'available',
+            'status': row.status,
+        }
+        for row in db.session.execute(query)
+    ]
+
+
+def search_rooms(query, start=None, end=None, amenities=None):
+    """Narrow a SELECT over ``rooms`` to rooms bookable for ``[start, end)``.
+
+    Amenities resolve through one grouped subquery on ``room_amenities`` and
+    the dates through an indexed NOT EXISTS probe per room, so the database
+    plans them together with whatever price, capacity and type filters
+    ``query`` already carries. Without dates only the amenities apply.
+    """
+    query = filter_rooms(query, amenities=amenities)
+    if start is not None:
+        query = query.where(
+            Room.status == 'available',
+            ~exists().where(overlap_clause(start, end, room_id=Room.id)),
+        )
+    return query
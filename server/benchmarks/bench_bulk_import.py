@@ -0,0 +1,81 @@
+"""Rows per second through POST /guests/bulk and /reservations/bulk.
+
+    python benchmarks/bench_bulk_import.py --rows 50000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_restful import Api
+from config import db
+from app import GuestsBulk, ReservationsBulk
+
+
+def make_app(path, rooms):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    api = Api(app)
+    api.add_resource(GuestsBulk, '/guests/bulk')
+    api.add_resource(ReservationsBulk, '/reservations/bulk')
+    with app.app_context():
+        db.create_all()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO rooms (id, room_number, room_type, price, capacity, status) VALUES (?, ?, ?, ?, ?, ?)',
+        [(i, str(i), 'Standard', 99.99, 2, 'available') for i in range(1, rooms + 1)],
+    )
+    conn.commit()
+    conn.close()
+    return app
+
+
+def upload(client, url, records):
+    body = '\n'.join(json.dumps(record) for record in records)
+    began = time.perf_counter()
+    response = client.post(url, data=body, content_type='application/x-ndjson')
+    elapsed = time.perf_counter() - began
+    result = response.get_json()
+    return elapsed, result['created'], len(result['errors'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--rooms', type=int, default=500)
+    args = parser.parse_args()
+
+    guests = [
+        {'name': f'Guest {i}', 'email': f'guest{i}@example.com', 'phone': '555-0100',
+         'idType': 'Passport', 'idNumber': str(i)}
+        for i in range(1, args.rows + 1)
+    ]
+    # Back-to-back two-night stays, round-robin across rooms: no overlaps.
+    start = date(2030, 1, 1)
+    reservations = [
+        {'guest_id': i, 'room_id': i % args.rooms + 1,
+         'check_in_date': (start + timedelta(days=2 * (i // args.rooms))).isoformat(),
+         'check_out_date': (start + timedelta(days=2 * (i // args.rooms) + 2)).isoformat()}
+        for i in range(1, args.rows + 1)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bulk.db'), args.rooms)
+        client = app.test_client()
+        for url, records in (('/guests/bulk', guests), ('/reservations/bulk', reservations)):
+            elapsed, created, errors = upload(client, url, records)
+            print(f'{url}: {created} created, {errors} errors in {elapsed:.2f} s ({created / elapsed:,.0f} rows/s)')
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
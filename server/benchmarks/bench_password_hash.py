@@ -0,0 +1,97 @@
+"""Password check cost per hash setting, and login latency under a burst.
+
+    python benchmarks/bench_password_hash.py --methods pbkdf2:sha256:100000,pbkdf2:sha256:260000,pbkdf2:sha256:600000
+
+For each method, reports the time to verify one password and p50/p95 of
+POST /staff/login when --burst logins arrive at once from --concurrency
+clients. Pick the strongest setting whose burst p95 you can live with and
+set it as PASSWORD_HASH_METHOD; existing hashes upgrade at the next login.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_restful import Api
+from werkzeug.security import check_password_hash, generate_password_hash
+from config import db
+from models import Staff
+from app import StaffLogin
+
+PASSWORD = 'correct horse battery staple'
+
+
+def make_app(path, method):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SECRET_KEY'] = 'bench'
+    app.config['PASSWORD_HASH_METHOD'] = method
+    db.init_app(app)
+    Api(app).add_resource(StaffLogin, '/staff/login')
+    with app.app_context():
+        db.create_all()
+        staff = Staff(name='Bench', position='Manager', email='bench@hotel.com', is_admin=True)
+        staff.set_password(PASSWORD)
+        db.session.add(staff)
+        db.session.commit()
+    return app
+
+
+def verify_ms(method, rounds):
+    stored = generate_password_hash(PASSWORD, method=method)
+    began = time.perf_counter()
+    for _ in range(rounds):
+        check_password_hash(stored, PASSWORD)
+    return (time.perf_counter() - began) / rounds * 1000
+
+
+def burst(app, logins, concurrency):
+    latencies, lock = [], threading.Lock()
+    remaining = [logins]
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            began = time.perf_counter()
+            response = client.post('/staff/login', json={'email': 'bench@hotel.com', 'password': PASSWORD})
+            elapsed = time.perf_counter() - began
+            assert response.status_code == 200, response.status_code
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', default='pbkdf2:sha256:100000,pbkdf2:sha256:260000,pbkdf2:sha256:600000')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--burst', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f'{"method":<26}{"verify ms":>10}{"burst p50":>11}{"burst p95":>11}')
+    for method in args.methods.split(','):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(os.path.join(tmp, 'bench.db'), method)
+            p50, p95 = burst(app, args.burst, args.concurrency)
+        print(f'{method:<26}{verify_ms(method, args.rounds):>10.1f}{p50:>11.1f}{p95:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Query plans and latency for the reservation access paths, before and after
+the indexes added in migration 3b8e1d4c9a52.
+
+Builds a throwaway SQLite database, so it never touches instance/app.db:
+
+    python benchmarks/bench_reservation_indexes.py --reservations 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, text
+from config import db
+from models import Reservation
+from availability import availability_query
+
+
+def populate(path, rooms, guests, reservations, seed):
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO rooms (id, room_number, room_type, price, capacity, status) VALUES (?, ?, ?, ?, ?, ?)',
+        ((i, str(i), 'Standard', 99.99, 2, 'available') for i in range(1, rooms + 1)),
+    )
+    conn.executemany(
+        'INSERT INTO guests (id, name, email, phone, id_type, id_number) VALUES (?, ?, ?, ?, ?, ?)',
+        ((i, f'Guest {i}', f'guest{i}@example.com', '555-0100', 'Passport', str(i)) for i in range(1, guests + 1)),
+    )
+
+    def rows():
+        for i in range(1, reservations + 1):
+            check_in = start + timedelta(days=rng.randrange(3 * 365))
+            check_out = check_in + timedelta(days=rng.randint(1, 7))
+            yield (
+                i,
+                rng.randint(1, guests),
+                rng.randint(1, rooms),
+                check_in.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                check_out.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                rng.choice(('confirmed', 'checked-in', 'checked-out', 'cancelled')),
+            )
+
+    conn.executemany(
+        'INSERT INTO reservations (id, guest_id, room_id, check_in_date, check_out_date, status) VALUES (?, ?, ?, ?, ?, ?)',
+        rows(),
+    )
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+def access_paths(guests):
+    day = date(2024, 6, 15)
+    return {
+        'availability (date)': availability_query(day),
+        'availability (range)': availability_query(day, day + timedelta(days=4)),
+        'guest reservations': select(Reservation)
+            .where(Reservation.guest_id == guests // 2)
+            .order_by(Reservation.check_in_date),
+        'upcoming check-ins': select(Reservation)
+            .where(Reservation.check_in_date >= day)
+            .order_by(Reservation.check_in_date)
+            .limit(5),
+    }
+
+
+def measure(engine, queries, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, query in queries.items():
+            compiled = query.compile(engine, compile_kwargs={'literal_binds': True})
+            plan = conn.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).fetchall()
+            timings = []
+            for _ in range(repeat):
+                began = time.perf_counter()
+                conn.execute(query).fetchall()
+                timings.append(time.perf_counter() - began)
+            results[name] = ([row[-1] for row in plan], statistics.median(timings))
+    return results
+
+
+def report(title, results):
+    print(f'\n== {title} ==')
+    for name, (plan, seconds) in results.items():
+        print(f'{name}: {seconds * 1000:.2f} ms (median)')
+        for step in plan:
+            print(f'    {step}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=300)
+    parser.add_argument('--guests', type=int, default=100000)
+    parser.add_argument('--reservations', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        engine = create_engine(f'sqlite:///{path}')
+        db.metadata.create_all(engine)
+        indexes = list(Reservation.__table__.indexes)
+        for index in indexes:
+            index.drop(engine)
+
+        print(f'Populating {args.reservations} reservations...')
+        populate(path, args.rooms, args.guests, args.reservations, args.seed)
+        queries = access_paths(args.guests)
+
+        before = measure(engine, queries, args.repeat)
+        for index in indexes:
+            index.create(engine)
+        with engine.connect() as conn:
+            conn.execute(text('ANALYZE'))
+        after = measure(engine, queries, args.repeat)
+        engine.dispose()
+
+    report('without indexes', before)
+    report('with indexes', after)
+    print('\n== speedup ==')
+    for name in queries:
+        print(f'{name}: {before[name][1] / after[name][1]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
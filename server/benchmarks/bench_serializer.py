@@ -0,0 +1,89 @@
+"""Compare SerializerMixin.to_dict() + jsonify with the precompiled
+RowSerializer on GET /reservations sized tables.
+
+    python benchmarks/bench_serializer.py --rows 10000 100000
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from config import db
+from models import Reservation
+from loading import reservation_profile
+from serializers import reservation_serializer
+from bench_reservation_indexes import populate
+
+
+def add_amenities(path, rooms):
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO amenities (id, name, description) VALUES (?, ?, ?)',
+        [(1, 'WiFi', 'High-speed internet access'), (2, 'Pool', 'Outdoor swimming pool'), (3, 'Breakfast', None)],
+    )
+    conn.executemany(
+        'INSERT INTO room_amenities (room_id, amenity_id) VALUES (?, ?)',
+        [(room, amenity) for room in range(1, rooms + 1) for amenity in range(1, room % 3 + 2)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def orm_to_dict():
+    reservations = Reservation.query.options(*reservation_profile.options()).all()
+    return jsonify([res.to_dict() for res in reservations]).get_data(as_text=True)
+
+
+def row_serializer():
+    rows = db.session.execute(reservation_serializer.statement()).all()
+    return reservation_serializer.dumps(rows)
+
+
+def timed(func, repeat):
+    timings, output = [], None
+    for _ in range(repeat):
+        db.session.remove()
+        began = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - began)
+    return statistics.median(timings), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--rooms', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            app = Flask(__name__)
+            app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+            app.json.compact = False
+            db.init_app(app)
+            with app.app_context():
+                db.create_all()
+                populate(path, args.rooms, max(rows // 10, 1), rows, seed=1)
+                add_amenities(path, args.rooms)
+
+                slow, expected = timed(orm_to_dict, args.repeat)
+                fast, output = timed(row_serializer, args.repeat)
+                db.session.remove()
+                db.engine.dispose()
+
+        assert output == expected, 'RowSerializer output differs from to_dict()'
+        print(f'{rows} reservations ({len(output) / 1e6:.1f} MB):')
+        print(f'    to_dict + jsonify: {slow * 1000:.0f} ms')
+        print(f'    RowSerializer:     {fast * 1000:.0f} ms ({slow / fast:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Throughput of the dev server against gunicorn, under the load-test workload.
+
+    python benchmarks/bench_servers.py --requests 2000 --concurrency 16
+
+Starts each server on the configured database in turn, drives it over HTTP
+with the load test's request mix and prints requests per second and
+latency percentiles side by side. Use a seeded copy of the database; the
+default read-heavy mix still writes a little.
+"""
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, os.path.join(SERVER_DIR, 'benchmarks'))
+
+from load_test import MIXES, HttpClient, Workload, run
+
+SERVERS = {
+    'flask dev server': (5555, [sys.executable, 'app.py'], {}),
+    'gunicorn gthread': (5556, ['gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                         {'PORT': '5556', 'GUNICORN_WORKER_CLASS': 'gthread'}),
+    'gunicorn gevent': (5557, ['gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                        {'PORT': '5557', 'GUNICORN_WORKER_CLASS': 'gevent'}),
+}
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            urllib.request.urlopen(url + '/amenities', timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def bench(name, args):
+    port, command, env = SERVERS[name]
+    env = {**os.environ, 'SECRET_KEY': 'bench', **env}
+    process = subprocess.Popen(command, cwd=SERVER_DIR, env=env, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f'http://127.0.0.1:{port}'
+        wait_until_up(url, process)
+        client = HttpClient(url)
+        workload = Workload(client, random.Random(args.seed))
+        return run(client, workload, MIXES[args.mix], args.requests, args.concurrency, args.seed)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', default=','.join(SERVERS))
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mix', choices=MIXES, default='read-heavy')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'{"server":<20}{"req/s":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}  errors')
+    for name in args.servers.split(','):
+        result = bench(name, args)
+        errors = sum(n for e in result['endpoints'].values() for status, n in e['status'].items() if status >= 500)
+        print(f'{name:<20}{result["throughput_rps"]:>8.1f}{result["p50_ms"]:>9.1f}'
+              f'{result["p95_ms"]:>9.1f}{result["p99_ms"]:>9.1f}  {errors}')
+
+
+if __name__ == '__main__':
+    main()
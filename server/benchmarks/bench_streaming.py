@@ -0,0 +1,72 @@
+"""Peak memory and time-to-first-byte of streamed GET /reservations exports.
+
+    python benchmarks/bench_streaming.py --rows 10000 100000 300000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from config import db
+from serializers import reservation_serializer
+from querying import ListQuery
+from models import Reservation
+from bench_reservation_indexes import populate
+from werkzeug.datastructures import MultiDict
+
+
+def export(app, ndjson):
+    """Consume a streamed export; return (first byte s, total s, bytes, peak bytes)."""
+    listing = ListQuery(Reservation, ['id'])
+    tracemalloc.start()
+    began = time.perf_counter()
+    with app.test_request_context():
+        rows, headers = listing.apply(reservation_serializer.statement(), MultiDict())
+        response = reservation_serializer.response(rows, headers=headers, ndjson=ndjson)
+        chunks = iter(response.response)
+        size = len(next(chunks))
+        first = time.perf_counter() - began
+        for chunk in chunks:
+            size += len(chunk)
+        db.session.remove()
+    total = time.perf_counter() - began
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 300000])
+    parser.add_argument('--rooms', type=int, default=300)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            app = Flask(__name__)
+            app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+            app.json.compact = False
+            db.init_app(app)
+            with app.app_context():
+                db.create_all()
+            populate(path, args.rooms, max(rows // 10, 1), rows, seed=1)
+
+            print(f'{rows} reservations:')
+            for label, ndjson in (('JSON array', False), ('NDJSON', True)):
+                first, total, size, peak = export(app, ndjson)
+                print(
+                    f'    {label:<10} first byte {first * 1000:6.1f} ms, total {total:6.2f} s, '
+                    f'{size / 1e6:6.1f} MB sent, peak memory {peak / 1e6:5.1f} MB'
+                )
+            with app.app_context():
+                db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
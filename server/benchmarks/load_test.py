@@ -0,0 +1,290 @@
+"""Load test every API resource with a realistic read/write mix.
+
+Runs in-process through the Flask test client against the local database
+(instance/app.db, or whatever the app is configured with), counting SQL
+queries per request, or over HTTP against a running server with --url.
+Over HTTP, query counts are read from the Server-Timing header when the
+server runs with INSTRUMENTATION=1. Writes go to that database, so point it
+at a seeded copy:
+
+    python seed.py --rooms 2000 --guests 100000 --reservations 1000000
+    python benchmarks/load_test.py --requests 5000 --concurrency 8 --output before.json
+    python benchmarks/load_test.py --requests 5000 --concurrency 8 --compare before.json
+
+Results (p50/p95/p99 latency, throughput, status codes and queries per
+request for each endpoint) are printed and saved as JSON for diffing.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Relative weights of each operation for the --mix profiles.
+MIXES = {
+    'read-heavy': {'read': 20, 'login': 1, 'write': 1},
+    'balanced': {'read': 6, 'login': 1, 'write': 3},
+    'write-heavy': {'read': 2, 'login': 1, 'write': 6},
+}
+
+
+class InProcessClient:
+    """Drive the app through its WSGI stack, counting queries per request."""
+
+    def __init__(self):
+        from sqlalchemy import event
+        from app import app
+        from config import db
+
+        self.app = app
+        self.local = threading.local()
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.local.queries = getattr(self.local, 'queries', 0) + 1
+
+    def request(self, method, path, body=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        self.local.queries = 0
+        began = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        data = response.get_data()
+        elapsed = time.perf_counter() - began
+        return response.status_code, elapsed, self.local.queries, data
+
+
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class HttpClient:
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        began = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req) as response:
+                status, headers, payload = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, headers, payload = e.code, e.headers, e.read()
+        elapsed = time.perf_counter() - began
+        match = SERVER_TIMING_QUERIES.search(headers.get('Server-Timing', ''))
+        return status, elapsed, int(match.group(1)) if match else None, payload
+
+
+class Workload:
+    """Generates requests against ids discovered from the API itself."""
+
+    def __init__(self, client, rng):
+        self.client = client
+        self.rng = rng
+        self.max_id = {name: self._max_id(name) for name in ('guests', 'rooms', 'reservations')}
+        self.created_guests = []
+        self.lock = threading.Lock()
+
+    def _max_id(self, collection):
+        status, _, _, data = self.client.request('GET', f'/{collection}?_sort=id&_order=desc&_limit=1&expand=')
+        rows = json.loads(data) if status == 200 else []
+        if not rows:
+            sys.exit(f'No {collection} found; seed the database first')
+        return rows[0]['id']
+
+    def _id(self, collection):
+        return self.rng.randint(1, self.max_id[collection])
+
+    def _day(self, spread=365):
+        return (date.today() + timedelta(days=self.rng.randint(-spread, spread))).isoformat()
+
+    def operations(self):
+        rng = self.rng
+        return {
+            'read': [
+                ('GET /guests', lambda: ('GET', f'/guests?_limit=50&_page={rng.randint(1, 20)}', None)),
+                ('GET /rooms', lambda: ('GET', '/rooms', None)),
+                ('GET /reservations', lambda: ('GET', '/reservations?check_in_date_gte=today&_sort=check_in_date&_limit=50', None)),
+                ('GET /rooms/availability', lambda: ('GET', f'/rooms/availability?date={self._day(90)}', None)),
+                ('GET /guests/<id>', lambda: ('GET', f'/guests/{self._id("guests")}', None)),
+                ('GET /rooms/<id>', lambda: ('GET', f'/rooms/{self._id("rooms")}?expand=amenities', None)),
+                ('GET /reservations/<id>', lambda: ('GET', f'/reservations/{self._id("reservations")}', None)),
+            ],
+            'login': [
+                ('POST /staff/login', lambda: ('POST', '/staff/login', {'email': 'admin@hotel.com', 'password': 'admin123'})),
+            ],
+            'write': [
+                ('POST /guests', self._new_guest),
+                ('POST /reservations', self._new_reservation),
+                ('PATCH /guests/<id>', lambda: ('PATCH', f'/guests/{self._id("guests")}', {'phone': f'555-{rng.randrange(10000):04d}'})),
+                ('PATCH /reservations/<id>', lambda: ('PATCH', f'/reservations/{self._id("reservations")}', {'special_requests': 'Extra towels'})),
+                ('DELETE /guests/<id>', self._delete_guest),
+            ],
+        }
+
+    def _new_guest(self):
+        token = f'{time.time_ns()}{self.rng.randrange(10 ** 6)}'
+        return 'POST', '/guests', {
+            'name': 'Load Test', 'email': f'load{token}@example.com', 'phone': '555-0000',
+            'idType': 'Passport', 'idNumber': token[-9:],
+        }
+
+    def _new_reservation(self):
+        check_in = date.today() + timedelta(days=self.rng.randint(200, 900))
+        return 'POST', '/reservations', {
+            'guest_id': self._id('guests'), 'room_id': self._id('rooms'),
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': (check_in + timedelta(days=self.rng.randint(1, 5))).isoformat(),
+        }
+
+    def _delete_guest(self):
+        with self.lock:
+            guest_id = self.created_guests.pop() if self.created_guests else None
+        if guest_id is None:
+            return self._new_guest()
+        return 'DELETE', f'/guests/{guest_id}', None
+
+    def record_created(self, label, status, data):
+        if label == 'POST /guests' and status == 201:
+            with self.lock:
+                self.created_guests.append(json.loads(data)['id'])
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def run(client, workload, mix, requests, concurrency, seed):
+    operations = workload.operations()
+    choices = [(label, make) for group in mix for label, make in operations[group]]
+    weights = [mix[group] / len(operations[group]) for group in mix for _ in operations[group]]
+    samples = defaultdict(lambda: {'latency': [], 'queries': [], 'status': defaultdict(int)})
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            label, make = rng.choices(choices, weights)[0]
+            method, path, body = make()
+            if (method, path) == ('POST', '/guests'):
+                # DELETE falls back to creating a guest when none are left to delete.
+                label = 'POST /guests'
+            status, elapsed, queries, data = client.request(method, path, body)
+            workload.record_created(label, status, data)
+            with lock:
+                sample = samples[label]
+                sample['latency'].append(elapsed)
+                sample['status'][status] += 1
+                if queries is not None:
+                    sample['queries'].append(queries)
+
+    threads = [threading.Thread(target=worker, args=(seed + i,)) for i in range(concurrency)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+
+    endpoints = {}
+    for label, sample in sorted(samples.items()):
+        latency = sample['latency']
+        endpoints[label] = {
+            'requests': len(latency),
+            'throughput_rps': len(latency) / wall,
+            'p50_ms': percentile(latency, 50) * 1000,
+            'p95_ms': percentile(latency, 95) * 1000,
+            'p99_ms': percentile(latency, 99) * 1000,
+            'queries_per_request': sum(sample['queries']) / len(sample['queries']) if sample['queries'] else None,
+            'max_queries': max(sample['queries']) if sample['queries'] else None,
+            'status': dict(sample['status']),
+        }
+    latency = [t for sample in samples.values() for t in sample['latency']]
+    return {
+        'wall_s': wall,
+        'throughput_rps': len(latency) / wall,
+        'p50_ms': percentile(latency, 50) * 1000,
+        'p95_ms': percentile(latency, 95) * 1000,
+        'p99_ms': percentile(latency, 99) * 1000,
+        'endpoints': endpoints,
+    }
+
+
+def report(result, baseline=None):
+    print(f'{"endpoint":<26}{"reqs":>6}{"rps":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}  status')
+    for label, e in result['endpoints'].items():
+        queries = '-' if e['queries_per_request'] is None else f'{e["queries_per_request"]:.1f}'
+        line = (f'{label:<26}{e["requests"]:>6}{e["throughput_rps"]:>8.1f}{e["p50_ms"]:>9.1f}'
+                f'{e["p95_ms"]:>9.1f}{e["p99_ms"]:>9.1f}{queries:>9}  {e["status"]}')
+        old = (baseline or {}).get('endpoints', {}).get(label)
+        if old:
+            line += f'  p95 {(e["p95_ms"] / old["p95_ms"] - 1) * 100:+.0f}%'
+        print(line)
+    print(f'total: {result["throughput_rps"]:.1f} req/s over {result["wall_s"]:.1f} s')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='hit a running server instead of running in-process')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mix', choices=MIXES, default='read-heavy')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='print p95 changes against an earlier results file')
+    args = parser.parse_args()
+
+    client = HttpClient(args.url) if args.url else InProcessClient()
+    workload = Workload(client, random.Random(args.seed))
+    result = run(client, workload, MIXES[args.mix], args.requests, args.concurrency, args.seed)
+    result['meta'] = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'mode': 'http' if args.url else 'in-process',
+        'mix': args.mix,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'max_ids': workload.max_id,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(result, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
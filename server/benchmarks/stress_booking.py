@@ -0,0 +1,108 @@
+"""Hammer POST /reservations from many threads and prove no room is ever
+double-booked.
+
+    python benchmarks/stress_booking.py --threads 16 --requests 200 --rooms 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_restful import Api
+from config import db
+from app import Reservations
+
+
+def make_app(path, rooms):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    Api(app).add_resource(Reservations, '/reservations')
+    with app.app_context():
+        db.create_all()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO rooms (id, room_number, room_type, price, capacity, status) VALUES (?, ?, ?, ?, ?, ?)',
+        [(i, str(i), 'Standard', 99.99, 2, 'available') for i in range(1, rooms + 1)],
+    )
+    conn.execute("INSERT INTO guests (id, name, email, phone, id_type, id_number) VALUES (1, 'Load', 'load@example.com', '0', 'Passport', '0')")
+    conn.commit()
+    conn.close()
+    return app
+
+
+def worker(app, requests, rooms, horizon, seed, results):
+    rng = random.Random(seed)
+    client = app.test_client()
+    start = date(2030, 1, 1)
+    for _ in range(requests):
+        check_in = start + timedelta(days=rng.randrange(horizon))
+        response = client.post('/reservations', json={
+            'guest_id': 1,
+            'room_id': rng.randint(1, rooms),
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': (check_in + timedelta(days=rng.randint(1, 4))).isoformat(),
+        })
+        results[response.status_code] += 1
+
+
+def double_bookings(path):
+    conn = sqlite3.connect(path)
+    overlaps = conn.execute('''
+        SELECT count(*) FROM reservations a JOIN reservations b
+          ON a.room_id = b.room_id AND a.id < b.id
+         AND a.check_in_date < b.check_out_date AND a.check_out_date > b.check_in_date
+         AND a.status IN ('confirmed', 'checked-in') AND b.status IN ('confirmed', 'checked-in')
+    ''').fetchone()[0]
+    conn.close()
+    return overlaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='requests per thread')
+    parser.add_argument('--rooms', type=int, default=5)
+    parser.add_argument('--horizon', type=int, default=60, help='days bookings are spread over')
+    parser.add_argument('--target', type=float, default=0, help='minimum requests per second')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stress.db')
+        app = make_app(path, args.rooms)
+        results = Counter()
+        threads = [
+            threading.Thread(target=worker, args=(app, args.requests, args.rooms, args.horizon, seed, results))
+            for seed in range(args.threads)
+        ]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        overlaps = double_bookings(path)
+        with app.app_context():
+            db.engine.dispose()
+
+    total = sum(results.values())
+    print(f'{total} requests in {elapsed:.2f} s ({total / elapsed:.0f} req/s) from {args.threads} threads')
+    print(f'status codes: {dict(sorted(results.items()))}')
+    print(f'double bookings: {overlaps}')
+    if overlaps or set(results) - {201, 409}:
+        sys.exit('FAILED: double bookings or unexpected errors')
+    if total / elapsed < args.target:
+        sys.exit(f'FAILED: below target of {args.target:.0f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Race DELETE /rooms/<id> and /reservations/<id> against bulk PATCHes that
+bump the same rows' versions, and prove every request gets a clean answer.
+
+    python benchmarks/stress_versions.py --threads 8 --rows 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_restful import Api
+from config import db
+from app import RoomsBulk, RoomById, ReservationsBulk, ReservationById
+
+# Deletes answer 204, 404 once a row is gone, or 409 when a PATCH bumped the
+# version in between. A bulk PATCH reports rows deleted under it as errors.
+EXPECTED = {
+    'delete': {204, 404, 409},
+    'patch': {200, 207, 400, 409},
+}
+
+
+def make_app(path, rows):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    api = Api(app)
+    api.add_resource(RoomsBulk, '/rooms/bulk')
+    api.add_resource(RoomById, '/rooms/<int:id>')
+    api.add_resource(ReservationsBulk, '/reservations/bulk')
+    api.add_resource(ReservationById, '/reservations/<int:id>')
+    with app.app_context():
+        db.create_all()
+    conn = sqlite3.connect(path)
+    # Rooms 1..rows are raced; reservations all sit in one extra room, which
+    # is never deleted.
+    conn.executemany(
+        'INSERT INTO rooms (id, room_number, room_type, price, capacity, status) VALUES (?, ?, ?, ?, ?, ?)',
+        [(i, str(i), 'Standard', 99.99, 2, 'available') for i in range(1, rows + 2)],
+    )
+    conn.execute("INSERT INTO guests (id, name, email, phone, id_type, id_number) VALUES (1, 'Load', 'load@example.com', '0', 'Passport', '0')")
+    conn.executemany(
+        'INSERT INTO reservations (id, guest_id, room_id, check_in_date, check_out_date, status) VALUES (?, ?, ?, ?, ?, ?)',
+        [(i, 1, rows + 1, '2030-01-01', '2030-01-02', 'confirmed') for i in range(1, rows + 1)],
+    )
+    conn.commit()
+    conn.close()
+    return app
+
+
+def versions(path, table, ids):
+    conn = sqlite3.connect(path)
+    marks = ', '.join('?' * len(ids))
+    found = conn.execute(f'SELECT id, version FROM {table} WHERE id IN ({marks})', ids).fetchall()
+    conn.close()
+    return found
+
+
+def patcher(app, path, rows, batch, seed, stop, results):
+    rng = random.Random(seed)
+    client = app.test_client()
+    while not stop.is_set():
+        ids = rng.sample(range(1, rows + 1), batch)
+        if rng.random() < 0.5:
+            records = [{'id': i, 'version': v, 'capacity': rng.randint(1, 4)} for i, v in versions(path, 'rooms', ids)]
+            url = '/rooms/bulk'
+        else:
+            records = [{'id': i, 'version': v, 'special_requests': str(rng.random())} for i, v in versions(path, 'reservations', ids)]
+            url = '/reservations/bulk'
+        if records:
+            results['patch', client.patch(url, json=records).status_code] += 1
+
+
+def deleter(app, ids, results):
+    client = app.test_client()
+    for table, row_id in ids:
+        results['delete', client.delete(f'/{table}/{row_id}').status_code] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8, help='patching threads; as many delete')
+    parser.add_argument('--rows', type=int, default=200, help='rooms and reservations to race')
+    parser.add_argument('--batch', type=int, default=20, help='records per bulk PATCH')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stress.db')
+        app = make_app(path, args.rows)
+        targets = [(t, i) for t in ('rooms', 'reservations') for i in range(1, args.rows + 1)]
+        random.Random(0).shuffle(targets)
+        results = Counter()
+        stop = threading.Event()
+        patchers = [
+            threading.Thread(target=patcher, args=(app, path, args.rows, args.batch, seed, stop, results))
+            for seed in range(args.threads)
+        ]
+        deleters = [
+            threading.Thread(target=deleter, args=(app, targets[n::args.threads], results))
+            for n in range(args.threads)
+        ]
+        began = time.perf_counter()
+        for thread in patchers + deleters:
+            thread.start()
+        for thread in deleters:
+            thread.join()
+        stop.set()
+        for thread in patchers:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        left = len(versions(path, 'rooms', list(range(1, args.rows + 1))))
+        left += len(versions(path, 'reservations', list(range(1, args.rows + 1))))
+        with app.app_context():
+            db.engine.dispose()
+
+    total = sum(results.values())
+    print(f'{total} requests in {elapsed:.2f} s ({total / elapsed:.0f} req/s) from {2 * args.threads} threads')
+    for kind in EXPECTED:
+        print(f'{kind}: {dict(sorted((code, n) for (k, code), n in results.items() if k == kind))}')
+    print(f'rows left after the race: {left}')
+    unexpected = {(kind, code) for kind, code in results if code not in EXPECTED[kind]}
+    if unexpected:
+        sys.exit(f'FAILED: unexpected responses {sorted(unexpected)}')
+    if results['delete', 409] + results['delete', 204] + results['delete', 404] != len(targets):
+        sys.exit('FAILED: a delete went unanswered')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import random
+import time
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from config import db
+from models import Room, Reservation
+from availability import ACTIVE_STATUSES, overlap_clause
+
+MAX_ATTEMPTS = 6
+# SQLSTATEs Postgres uses for serialization failures and deadlocks.
+RETRY_SQLSTATES = ('40001', '40P01')
+
+
+class RoomNotFound(LookupError):
+    pass
+
+
+class BookingConflict(Exception):
+    """Raised when a reservation overlaps active bookings for the same room."""
+
+    def __init__(self, conflicts):
+        super().__init__('Room is already booked for those dates')
+        self.conflicts = conflicts
+
+
+class VersionConflict(Exception):
+    """Raised when a row changed after the version a client last read."""
+
+    def __init__(self, version):
+        super().__init__('Changed since that version')
+        self.version = version
+
+
+def retryable(error):
+    orig = getattr(error, 'orig', None)
+    if getattr(orig, 'pgcode', None) in RETRY_SQLSTATES:
+        return True
+    return 'database is locked' in str(orig) or 'database is busy' in str(orig)
+
+
+def begin_write():
+    """Open the booking transaction holding the database write lock.
+
+    SQLite only takes its write lock on the first write, so two bookings could
+    both pass the overlap probe. BEGIN IMMEDIATE takes it up front instead;
+    other backends rely on the room row lock in ``_lock_room``.
+    """
+    conn = db.session.connection()
+    if conn.dialect.name == 'sqlite' and not conn.connection.driver_connection.in_transaction:
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def _lock_room(room_id):
+    found = db.session.execute(
+        select(Room.id).where(Room.id == room_id).with_for_update()
+    ).scalar()
+    if found is None:
+        raise RoomNotFound('Room not found')
+
+
+def conflicting_reservations(reservation):
+    """Ids of active reservations overlapping ``reservation`` on its room."""
+    if reservation.status not in ACTIVE_STATUSES:
+        return []
+    query = select(Reservation.id).where(
+        overlap_clause(reservation.check_in_date, reservation.check_out_date, room_id=reservation.room_id)
+    )
+    if reservation.id is not None:
+        query = query.where(Reservation.id != reservation.id)
+    return list(db.session.execute(query).scalars())
+
+
+def commit_booking(stage):
+    """Stage and commit a reservation without ever double-booking its room.
+
+    ``stage`` is called inside a write-locked transaction and must add or
+    modify one reservation in the session and return it. The room row is
+    locked, the overlap probe runs against the (room, dates) index, and the
+    reservation is committed only if nothing overlaps. Lock timeouts and
+    serialization failures are retried with jittered backoff, calling
+    ``stage`` again on a fresh transaction.
+
+    Raises ``BookingConflict``, ``RoomNotFound``, or ``ValueError`` for an
+    empty date range.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            begin_write()
+            reservation = stage()
+            if reservation.check_out_date <= reservation.check_in_date:
+                raise ValueError('check_out_date must be after check_in_date')
+            # Keep the pending row out of the database until the probe passes.
+            with db.session.no_autoflush:
+                _lock_room(reservation.room_id)
+                conflicts = conflicting_reservations(reservation)
+            if conflicts:
+                raise BookingConflict(conflicts)
+            db.session.commit()
+            return reservation
+        except DBAPIError as e:
+            db.session.rollback()
+            if not retryable(e) or attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        except Exception:
+            db.session.rollback()
+            raise
@@ -0,0 +1,404 @@
+import json
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from config import db
+from models import Guest, Room, Reservation
+from availability import ACTIVE_STATUSES, overlap_clause
+from booking import MAX_ATTEMPTS, begin_write, retryable
+from daily_occupancy import record_stays
+from changes import change_feed
+
+# Rows per executemany batch, and ids per IN (...) lookup.
+INSERT_BATCH = 1000
+LOOKUP_BATCH = 500
+
+GUEST_REQUIRED = ['name', 'email', 'phone', 'idType', 'idNumber']
+RESERVATION_REQUIRED = ['guest_id', 'room_id', 'check_in_date', 'check_out_date']
+
+# Fields a bulk PATCH may set, with the JSON types each accepts. Anything that
+# moves a stay or reprices a room is left to PATCH /<resource>/<id>.
+ROOM_UPDATES = {'status': (str,), 'capacity': (int,)}
+RESERVATION_UPDATES = {'status': (str,), 'special_requests': (str, type(None))}
+
+
+def parse_records(req):
+    """Read a JSON array, or one JSON object per line for NDJSON bodies.
+
+    Returns ``(records, errors)``; a malformed NDJSON line becomes an error
+    for that line instead of failing the whole upload.
+    """
+    if req.mimetype != 'application/x-ndjson':
+        data = req.get_json()
+        if not isinstance(data, list):
+            raise ValueError('Expected a JSON array')
+        return data, []
+    records, errors = [], []
+    for line in req.stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            errors.append({'index': len(records), 'error': f'Invalid JSON: {e}'})
+            records.append(None)
+    return records, errors
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _existing(column, values):
+    found = set()
+    for chunk in _chunks(values, LOOKUP_BATCH):
+        found.update(db.session.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def _insert(table, rows):
+    for chunk in _chunks(rows, INSERT_BATCH):
+        db.session.execute(insert(table), chunk)
+
+
+def _missing(record, required):
+    if not isinstance(record, dict):
+        return 'Expected a JSON object'
+    missing = [field for field in required if field not in record]
+    if missing:
+        return f'Missing required fields: {", ".join(missing)}'
+    return None
+
+
+def _not_text(record, required, optional=()):
+    wrong = [field for field in required if not isinstance(record[field], str)]
+    wrong += [field for field in optional if record.get(field) is not None and not isinstance(record[field], str)]
+    if wrong:
+        return f'Fields must be strings: {", ".join(wrong)}'
+    return None
+
+
+def import_guests(records, errors=()):
+    """Validate and insert guests in one transaction.
+
+    Emails already on file are found with batched IN queries rather than one
+    lookup per row. Returns ``(created, errors)`` where each error names the
+    index of the rejected record.
+    """
+    errors = list(errors)
+    failed = {e['index'] for e in errors}
+    rows, seen = [], {}
+    for index, record in enumerate(records):
+        if index in failed:
+            continue
+        problem = _missing(record, GUEST_REQUIRED)
+        if problem is None:
+            problem = _not_text(record, GUEST_REQUIRED, optional=['address'])
+        if problem is None and record['email'].lower() in seen:
+            problem = f'Duplicate email in request (record {seen[record["email"].lower()]})'
+        if problem:
+            errors.append({'index': index, 'error': problem})
+            continue
+        seen[record['email'].lower()] = index
+        rows.append((index, {
+            'name': record['name'],
+            'email': record['email'],
+            'phone': record['phone'],
+            'address': record.get('address'),
+            'id_type': record['idType'],
+            'id_number': record['idNumber'],
+        }))
+
+    try:
+        begin_write()
+        # Emails are unique regardless of case.
+        taken = _existing(func.lower(Guest.email), seen)
+        valid = []
+        for index, row in rows:
+            if row['email'].lower() in taken:
+                errors.append({'index': index, 'error': 'Email already exists'})
+            else:
+                valid.append(row)
+        _insert(Guest.__table__, valid)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(valid), sorted(errors, key=lambda e: e['index'])
+
+
+class _RoomSchedule:
+    """Sorted, non-overlapping [check_in, check_out) intervals for one room."""
+
+    def __init__(self):
+        self.starts, self.ends = [], []
+
+    def add(self, start, end):
+        i = bisect_left(self.starts, start)
+        if i > 0 and self.ends[i - 1] > start:
+            return False
+        if i < len(self.starts) and self.starts[i] < end:
+            return False
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        return True
+
+
+def import_reservations(records, errors=()):
+    """Validate and insert reservations in one write-locked transaction.
+
+    Guests and rooms are checked with batched IN queries, and overlaps are
+    resolved in memory against the active bookings already held by the
+    affected rooms over the uploaded date span, as well as against earlier
+    records in the same upload. Returns ``(created, errors)``.
+    """
+    errors = list(errors)
+    failed = {e['index'] for e in errors}
+    rows = []
+    for index, record in enumerate(records):
+        if index in failed:
+            continue
+        problem = _missing(record, RESERVATION_REQUIRED)
+        if problem is None:
+            try:
+                row = {
+                    'guest_id': int(record['guest_id']),
+                    'room_id': int(record['room_id']),
+                    'check_in_date': datetime.fromisoformat(record['check_in_date']),
+                    'check_out_date': datetime.fromisoformat(record['check_out_date']),
+                    'status': record.get('status', 'confirmed'),
+                    'special_requests': record.get('special_requests'),
+                }
+            except (TypeError, ValueError) as e:
+                problem = str(e)
+            else:
+                if row['check_out_date'] <= row['check_in_date']:
+                    problem = 'check_out_date must be after check_in_date'
+        if problem:
+            errors.append({'index': index, 'error': problem})
+            continue
+        rows.append((index, row))
+
+    try:
+        begin_write()
+        rooms = _existing(Room.id, {row['room_id'] for _, row in rows})
+        guests = _existing(Guest.id, {row['guest_id'] for _, row in rows})
+        active = [(i, row) for i, row in rows if row['status'] in ACTIVE_STATUSES]
+        schedules = {}
+        if active:
+            start = min(row['check_in_date'] for _, row in active)
+            end = max(row['check_out_date'] for _, row in active)
+            for chunk in _chunks({row['room_id'] for _, row in active}, LOOKUP_BATCH):
+                booked = db.session.execute(
+                    select(Reservation.room_id, Reservation.check_in_date, Reservation.check_out_date)
+                    .where(overlap_clause(start, end), Reservation.room_id.in_(chunk))
+                )
+                for room_id, check_in, check_out in booked:
+                    schedules.setdefault(room_id, _RoomSchedule()).add(check_in, check_out)
+
+        valid = []
+        for index, row in rows:
+            if row['room_id'] not in rooms:
+                problem = 'Room not found'
+            elif row['guest_id'] not in guests:
+                problem = 'Guest not found'
+            elif row['status'] in ACTIVE_STATUSES and not schedules.setdefault(
+                    row['room_id'], _RoomSchedule()).add(row['check_in_date'], row['check_out_date']):
+                problem = 'Room is already booked for those dates'
+            else:
+                valid.append(row)
+                continue
+            errors.append({'index': index, 'error': problem})
+        _insert(Reservation.__table__, valid)
+        # Core inserts skip the ORM flush that keeps the summary current.
+        record_stays(db.session.connection(), valid)
+        if valid:
+            # One entry for the batch; subscribers reload rather than replay it.
+            change_feed.record(db.session, 'reservation', 'bulk', data={'created': len(valid)})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(valid), sorted(errors, key=lambda e: e['index'])
+
+
+class UpdateRaced(Exception):
+    """Raised when rows kept changing between reading and updating them."""
+
+    def __init__(self):
+        super().__init__('Rows changed while they were being updated; try again')
+
+
+def _parse_update(record, allowed):
+    problem = _missing(record, ['id', 'version'])
+    if problem:
+        raise ValueError(problem)
+    for field in ('id', 'version'):
+        if isinstance(record[field], bool) or not isinstance(record[field], int):
+            raise ValueError(f'{field} must be an integer')
+    unknown = sorted(set(record) - set(allowed) - {'id', 'version'})
+    if unknown:
+        raise ValueError(f'Cannot update {", ".join(unknown)}')
+    values = {field: value for field, value in record.items() if field in allowed}
+    if not values:
+        raise ValueError('Nothing to update')
+    for field, value in values.items():
+        # bool is an int in Python, but not a capacity.
+        if isinstance(value, bool) or not isinstance(value, allowed[field]):
+            raise ValueError(f'Invalid value for {field}')
+    return record['id'], record['version'], values
+
+
+def _apply_updates(model, updates, check, after):
+    table = model.__table__
+    begin_write()
+    current = {}
+    for chunk in _chunks([row_id for _, row_id, _, _ in updates], LOOKUP_BATCH):
+        current.update((row.id, row._mapping) for row in db.session.execute(select(table).where(table.c.id.in_(chunk))))
+
+    pending, conflicts, errors = [], [], []
+    for index, row_id, version, values in updates:
+        old = current.get(row_id)
+        if old is None:
+            errors.append({'index': index, 'id': row_id, 'error': 'Not found'})
+        elif old['version'] != version:
+            conflicts.append({'index': index, 'id': row_id, 'version': old['version'],
+                              'error': f'Changed since version {version}'})
+        else:
+            pending.append((index, old, values))
+    if check is not None and pending:
+        rejected = check(pending)
+        errors.extend({'index': index, 'id': old['id'], 'error': rejected[index]}
+                      for index, old, _ in pending if index in rejected)
+        pending = [item for item in pending if item[0] not in rejected]
+
+    # executemany needs the same columns in every row, so one statement per field set.
+    groups = {}
+    for _, old, values in pending:
+        groups.setdefault(tuple(sorted(values)), []).append({'b_id': old['id'], 'b_version': old['version'], **values})
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam('b_id'), table.c.version == bindparam('b_version'))
+        .values(version=table.c.version + 1)
+    )
+    for params in groups.values():
+        for chunk in _chunks(params, INSERT_BATCH):
+            if db.session.execute(statement, chunk).rowcount != len(chunk):
+                raise UpdateRaced()
+
+    rows = [(old, dict(old, **values, version=old['version'] + 1)) for _, old, values in pending]
+    if after is not None and rows:
+        after(rows)
+    change_feed.record_rows(db.session, model, 'update', [new for _, new in rows])
+    updated = [{'index': index, 'id': new['id'], 'version': new['version']}
+               for (index, _, _), (_, new) in zip(pending, rows)]
+    return updated, conflicts, errors
+
+
+def update_rows(model, records, allowed, errors=(), check=None, after=None):
+    """Apply partial updates to many rows in one transaction, with optimistic concurrency.
+
+    Each record holds an ``id``, the ``version`` the client last read and
+    the ``allowed`` fields to change. Current versions come from batched IN
+    queries; a stale record is a conflict, reported with the current
+    version, and the rest are written with executemany
+    ``UPDATE ... WHERE id = ? AND version = ?`` statements that bump the
+    version. No row lock is held in between, so on Postgres another writer
+    can still get in first; then fewer rows match, and the whole batch is
+    rolled back and read again, turning the late change into a conflict.
+
+    ``check(pending)`` may veto records: it gets ``(index, old_row,
+    values)`` triples and returns ``{index: problem}``. ``after(rows)``
+    gets ``(old, new)`` row mappings inside the transaction. Returns
+    ``(updated, conflicts, errors)``.
+    """
+    errors = list(errors)
+    failed = {e['index'] for e in errors}
+    updates, seen = [], set()
+    for index, record in enumerate(records):
+        if index in failed:
+            continue
+        try:
+            row_id, version, values = _parse_update(record, allowed)
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        if row_id in seen:
+            errors.append({'index': index, 'id': row_id, 'error': 'Duplicate id'})
+            continue
+        seen.add(row_id)
+        updates.append((index, row_id, version, values))
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            updated, conflicts, problems = _apply_updates(model, updates, check, after)
+            db.session.commit()
+            break
+        except (UpdateRaced, DBAPIError) as e:
+            db.session.rollback()
+            if (isinstance(e, DBAPIError) and not retryable(e)) or attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        except Exception:
+            db.session.rollback()
+            raise
+    errors = sorted(errors + problems, key=lambda e: e['index'])
+    return updated, conflicts, errors
+
+
+def _check_reactivations(pending):
+    """Refuse status changes that would put a stay back on a room booked over it."""
+    def active(old, values):
+        return values.get('status', old['status']) in ACTIVE_STATUSES
+
+    reviving = [(index, old) for index, old, values in pending
+                if old['status'] not in ACTIVE_STATUSES and active(old, values)]
+    if not reviving:
+        return {}
+    # Stays this batch cancels no longer hold their rooms.
+    released = {old['id'] for _, old, values in pending if old['status'] in ACTIVE_STATUSES and not active(old, values)}
+    room_ids = {old['room_id'] for _, old in reviving}
+    start = min(old['check_in_date'] for _, old in reviving)
+    end = max(old['check_out_date'] for _, old in reviving)
+    schedules = {}
+    for chunk in _chunks(room_ids, LOOKUP_BATCH):
+        # Room row locks, as commit_booking takes them, keep concurrent
+        # bookings out of these rooms until commit.
+        db.session.execute(select(Room.id).where(Room.id.in_(chunk)).order_by(Room.id).with_for_update()).all()
+        booked = db.session.execute(
+            select(Reservation.id, Reservation.room_id, Reservation.check_in_date, Reservation.check_out_date)
+            .where(overlap_clause(start, end), Reservation.room_id.in_(chunk))
+        )
+        for reservation_id, room_id, check_in, check_out in booked:
+            if reservation_id not in released:
+                schedules.setdefault(room_id, _RoomSchedule()).add(check_in, check_out)
+    return {
+        index: 'Room is already booked for those dates'
+        for index, old in reviving
+        if not schedules.setdefault(old['room_id'], _RoomSchedule()).add(old['check_in_date'], old['check_out_date'])
+    }
+
+
+def _recount_stays(rows):
+    # Only the status can change here, so a stay's nights only move in or out
+    # of the summary as a whole.
+    changed = [(old, new) for old, new in rows if old['status'] != new['status']]
+    if changed:
+        conn = db.session.connection()
+        record_stays(conn, [old for old, _ in changed], sign=-1)
+        record_stays(conn, [new for _, new in changed])
+
+
+def update_rooms(records, errors=()):
+    return update_rows(Room, records, ROOM_UPDATES, errors)
+
+
+def update_reservations(records, errors=()):
+    return update_rows(Reservation, records, RESERVATION_UPDATES, errors,
+                       check=_check_reactivations, after=_recount_stays)
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import current_app, request
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Bodies larger than this are served but never stored.
+MAX_ENTRY_BYTES = 1024 * 1024
+
+
+class MemoryBackend:
+    """Per-process LRU store with a TTL on every entry.
+
+    ``namespace`` is random per process, so an ETag from before a restart is
+    never honoured. A shared backend (Redis, memcached, ...) only needs
+    ``get``, ``set`` and a fixed ``namespace``.
+    """
+
+    def __init__(self, max_entries=512, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.token = os.urandom(8).hex()
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    @property
+    def namespace(self):
+        # Workers forked from a preloading master share ``token``; the pid keeps them apart.
+        return f'{self.token}-{os.getpid()}'
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class ResponseCache:
+    """Caches GET responses, invalidated by writes to the tables they read.
+
+    Every key includes the current generation of each table the endpoint
+    depends on. A session commit that wrote to a table bumps its row in
+    ``generations`` within the same transaction, so stale entries simply
+    stop being looked up and age out of the LRU. Generations live in the
+    database rather than in the process, so a write made by another worker
+    or by ``flask run-sweeps`` invalidates this worker's entries too; the
+    price is one small indexed read per cached request. The ETag is derived
+    from the same key, which lets a matching ``If-None-Match`` be answered
+    with 304 before the handler runs.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.db = None
+        self.generations = None
+
+    def init_app(self, app, db, generations, backend=None):
+        ttl = app.config.get('RESPONSE_CACHE_TTL', 30)
+        if backend is None and ttl <= 0:
+            return
+        self.backend = backend or MemoryBackend(app.config.get('RESPONSE_CACHE_SIZE', 512), ttl)
+        self.db = db
+        self.generations = generations
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'after_cursor_execute', self._track_write)
+        event.listen(engine, 'commit', self._discard)
+        event.listen(engine, 'rollback', self._discard)
+        if not event.contains(db.session, 'before_commit', self._publish):
+            event.listen(db.session, 'before_commit', self._publish)
+
+    def _track_write(self, conn, cursor, statement, parameters, context, executemany):
+        if context is None or context.compiled is None:
+            return
+        if not (context.isinsert or context.isupdate or context.isdelete):
+            return
+        table = getattr(context.compiled.statement, 'table', None)
+        if table is not None and table is not self.generations:
+            conn.info.setdefault('written_tables', set()).add(table.name)
+
+    def _publish(self, session):
+        # Pick up whatever commit() is about to flush.
+        session.flush()
+        if session.get_transaction() is None:
+            return
+        written = session.connection().info.pop('written_tables', None)
+        if not written:
+            return
+        table = self.generations
+        insert = (postgresql if session.connection().dialect.name == 'postgresql' else sqlite).insert
+        stmt = insert(table).values([{'table_name': name, 'generation': 1} for name in sorted(written)])
+        # Sorted, so concurrent commits lock the rows in the same order.
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.table_name],
+            set_={'generation': table.c.generation + 1},
+        )
+        session.execute(stmt)
+
+    def _discard(self, conn):
+        conn.info.pop('written_tables', None)
+
+    def _generations(self, tables):
+        if not tables:
+            return ()
+        table = self.generations
+        found = dict(self.db.session.execute(
+            select(table.c.table_name, table.c.generation).where(table.c.table_name.in_(tables))
+        ).all())
+        return tuple(found.get(name, 0) for name in tables)
+
+    def _key(self, tables, ttl=None):
+        tables = sorted(tables)
+        parts = [
+            self.backend.namespace,
+            request.base_url,
+            repr(sorted(request.args.items(multi=True))),
+            request.headers.get('Accept', ''),
+            date.today().isoformat(),
+            repr(list(zip(tables, self._generations(tables)))),
+        ]
+        if ttl:
+            # Roll the key (and so the ETag) over every ``ttl`` seconds.
+            parts.append(str(int(time.time() // ttl)))
+        return hashlib.sha1('\0'.join(parts).encode()).hexdigest()
+
+    def cached(self, tables, ttl=None):
+        """Cache a resource's ``get``; ``tables`` may be a callable of the request.
+
+        A callable that raises ``ValueError`` (a bad query string) bypasses the
+        cache so the handler can report the error itself. With ``ttl`` entries
+        last at most that many seconds (0 turns caching off); with ``tables``
+        empty as well that becomes a purely time-based cache, for summaries
+        whose tables change too often to key on.
+        """
+        def decorator(method):
+            @wraps(method)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or ttl == 0:
+                    return method(*args, **kwargs)
+                try:
+                    key = self._key(tables() if callable(tables) else tables, ttl)
+                except ValueError:
+                    return method(*args, **kwargs)
+                if request.if_none_match.contains(key):
+                    response = current_app.response_class(status=304)
+                    response.set_etag(key)
+                    response.headers['Cache-Control'] = 'no-cache'
+                    return response
+
+                hit = self.backend.get(key)
+                if hit is not None:
+                    status, headers, body = hit
+                    response = current_app.response_class(body, status=status, headers=headers)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = method(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                response.set_etag(key)
+                # Let browsers keep the body but revalidate it every time.
+                response.headers['Cache-Control'] = 'no-cache'
+                response.headers['X-Cache'] = 'MISS'
+                headers = list(response.headers.items())
+                if response.is_streamed:
+                    response.response = self._tee(key, response.response, headers, ttl)
+                else:
+                    body = response.get_data()
+                    if len(body) <= MAX_ENTRY_BYTES:
+                        self.backend.set(key, (response.status_code, headers, body), ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def _tee(self, key, body, headers, ttl=None):
+        chunks, size = [], 0
+        try:
+            for chunk in body:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                yield chunk
+                if chunks is not None:
+                    size += len(chunk)
+                    if size <= MAX_ENTRY_BYTES:
+                        chunks.append(chunk)
+                    else:
+                        chunks = None
+            if chunks is not None:
+                self.backend.set(key, (200, headers, b''.join(chunks)), ttl)
+        finally:
+            close = getattr(body, 'close', None)
+            if close is not None:
+                close()
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,308 @@
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from sqlalchemy import event, func, insert, select, text
+from models import Room, Reservation, ChangeLog
+from loading import ROOM_FIELDS, RESERVATION_FIELDS
+
+CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+# Recent entries kept in memory for streams; a subscriber further behind
+# than this reads from the table instead.
+BUFFER_SIZE = 1024
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 15
+RECONNECT_MS = 3000
+# Seconds a client turned away for lack of stream slots should poll before
+# trying again.
+STREAM_RETRY_AFTER = 60
+# Any constant will do, as long as nothing else takes the same advisory lock.
+POSTGRES_LOCK_KEY = 0x6368616e6765
+
+TRACKED = {
+    Room: ('room', ROOM_FIELDS),
+    Reservation: ('reservation', RESERVATION_FIELDS),
+}
+
+change_log = ChangeLog.__table__
+
+
+class CursorExpired(LookupError):
+    """Raised when entries after a cursor have already been pruned."""
+
+
+def _json_value(model, value):
+    # As SerializerMixin.to_dict() would render it.
+    if isinstance(value, datetime):
+        return value.strftime(model.datetime_format)
+    return value
+
+
+def _entry(row):
+    return {
+        'id': row.id,
+        'entity': row.entity,
+        'entity_id': row.entity_id,
+        'op': row.op,
+        'data': json.loads(row.data) if row.data else None,
+        'changed_at': row.changed_at.isoformat() if row.changed_at else None,
+    }
+
+
+def _event(entry):
+    return f'id: {entry["id"]}\nevent: change\ndata: {json.dumps(entry)}\n\n'
+
+
+class ChangeFeed:
+    """Room and reservation writes, as a log clients can catch up from.
+
+    Flushed inserts, updates and deletes are collected per session and
+    appended to ``change_log`` just before the transaction commits, so a
+    rolled-back write never shows up. Ids are the clients' cursors and must
+    become visible in order: SQLite has one writer at a time anyway, and on
+    Postgres the append takes a transaction-level advisory lock, held only
+    for the insert and the commit itself.
+
+    Streams share one poller thread per process that reads new entries into
+    a ring buffer and wakes every subscriber, so an idle subscriber costs a
+    blocked generator rather than a database connection or a query per
+    second. It still holds a worker thread (or greenlet) for as long as it
+    is open, so each process serves at most ``CHANGE_STREAM_LIMIT`` streams
+    and callers turn the rest away (see ``reserve``).
+    """
+
+    def __init__(self):
+        self.engine = None
+        self.logger = None
+        self.lock = threading.Lock()
+        self.updated = threading.Condition(self.lock)
+        self.wake = threading.Event()
+        self.buffer = deque()
+        self.floor = self.cursor = 0
+        self.subscribers = 0
+        self.streams = 0
+        self.max_streams = 0
+        self.poller = None
+
+    def init_app(self, app, db):
+        with app.app_context():
+            self.engine = db.engine
+        self.logger = app.logger
+        self.max_streams = app.config['CHANGE_STREAM_LIMIT']
+        for name, listener in (
+            ('after_flush', self._collect),
+            ('before_commit', self._append),
+            ('after_commit', self._published),
+            ('after_rollback', self._discard),
+        ):
+            if not event.contains(db.session, name, listener):
+                event.listen(db.session, name, listener)
+
+    # Writing
+
+    def record(self, session, entity, op, entity_id=None, data=None):
+        """Queue an entry for the session's transaction, e.g. for a Core bulk write."""
+        pending = session.info.setdefault('changes', {})
+        key = (entity, entity_id) if entity_id is not None else (entity, op, len(pending))
+        previous = pending.get(key)
+        if previous is not None and previous['op'] == 'create':
+            if op == 'delete':
+                # Never committed, so nobody needs to hear about it.
+                del pending[key]
+                return
+            op = 'create'
+        pending.pop(key, None)
+        pending[key] = {
+            'entity': entity,
+            'entity_id': entity_id,
+            'op': op,
+            'data': json.dumps(data) if data is not None else None,
+        }
+
+    def record_rows(self, session, model, op, rows):
+        """Queue entries for rows written with Core, e.g. ``UPDATE ... RETURNING``.
+
+        Rows may be result rows or mappings, and must carry every field the
+        entity is logged with.
+        """
+        entity, fields = TRACKED[model]
+        for row in rows:
+            row = getattr(row, '_mapping', row)
+            data = {field: _json_value(model, row[field]) for field in fields}
+            self.record(session, entity, op, row['id'], data)
+
+    def _collect(self, session, flush_context):
+        changed = [obj for obj in session.dirty if session.is_modified(obj)]
+        for op, objects in (('create', session.new), ('update', changed), ('delete', session.deleted)):
+            for obj in objects:
+                tracked = TRACKED.get(type(obj))
+                if tracked is None:
+                    continue
+                entity, fields = tracked
+                data = None if op == 'delete' else obj.to_dict(only=fields)
+                self.record(session, entity, op, obj.id, data)
+
+    def _append(self, session):
+        # Pick up whatever commit() is about to flush.
+        session.flush()
+        pending = session.info.pop('changes', None)
+        if not pending:
+            return
+        conn = session.connection()
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': POSTGRES_LOCK_KEY})
+        conn.execute(insert(change_log), list(pending.values()))
+        session.info['changes_appended'] = True
+
+    def _published(self, session):
+        if session.info.pop('changes_appended', False):
+            self.wake.set()
+
+    def _discard(self, session):
+        session.info.pop('changes', None)
+        session.info.pop('changes_appended', None)
+
+    # Reading
+
+    def latest(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(change_log.c.id))).scalar() or 0
+
+    def read(self, since, limit=CHANGES_LIMIT):
+        """Up to ``limit`` entries after cursor ``since``, oldest first.
+
+        Raises ``CursorExpired`` when entries after ``since`` have been
+        pruned, so the client knows to reload instead of applying a diff
+        with a hole in it.
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(change_log).where(change_log.c.id > since).order_by(change_log.c.id).limit(limit)
+            ).all()
+            # Ids can skip after a failed commit; only a gap reaching below
+            # the oldest retained entry means something was pruned.
+            if rows and rows[0].id > since + 1:
+                if conn.execute(select(func.min(change_log.c.id))).scalar() > since:
+                    raise CursorExpired(since)
+        return [_entry(row) for row in rows]
+
+    # Streaming
+
+    def _poll(self):
+        while True:
+            with self.lock:
+                while not self.subscribers:
+                    self.updated.wait()
+                cursor = self.cursor
+            self.wake.wait(POLL_INTERVAL)
+            self.wake.clear()
+            entries = []
+            try:
+                entries = self._fetch(cursor)
+            except Exception:
+                # Keep serving what is buffered; the next poll tries again.
+                self.logger.exception('Polling the change log failed')
+            with self.lock:
+                entries = [entry for entry in entries if entry['id'] > self.cursor]
+                if not entries:
+                    continue
+                for entry in entries:
+                    self.buffer.append((entry['id'], _event(entry)))
+                    if len(self.buffer) > BUFFER_SIZE:
+                        self.floor = self.buffer.popleft()[0]
+                self.cursor = entries[-1]['id']
+                self.updated.notify_all()
+
+    def _fetch(self, cursor):
+        try:
+            return self.read(cursor, BUFFER_SIZE)
+        except CursorExpired:
+            # Pruned past the buffer; subscribers still behind it resync.
+            latest = self.latest()
+            with self.lock:
+                self.buffer.clear()
+                self.floor = self.cursor = max(self.cursor, latest)
+            return []
+
+    def _start(self):
+        with self.lock:
+            self.subscribers += 1
+            if self.subscribers > 1:
+                return
+        latest = self.latest()
+        with self.lock:
+            # Whatever is buffered went stale while nobody was listening.
+            self.buffer.clear()
+            self.floor = self.cursor = max(self.cursor, latest)
+            if self.poller is None:
+                self.poller = threading.Thread(target=self._poll, name='change-feed', daemon=True)
+                self.poller.start()
+            self.updated.notify_all()
+
+    def _stop(self):
+        with self.lock:
+            self.subscribers -= 1
+
+    def reserve(self):
+        """Take one of this process's stream slots; False when all are taken.
+
+        Pair every successful call with ``release``, e.g. from the
+        response's ``call_on_close``, which runs even if the stream never
+        started.
+        """
+        with self.lock:
+            if self.streams >= self.max_streams:
+                return False
+            self.streams += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.streams -= 1
+
+    def _buffered(self, last):
+        """Buffered ``(id, event)`` pairs after ``last``, or None if it is older than the buffer."""
+        if last < self.floor:
+            return None
+        return [item for item in self.buffer if item[0] > last]
+
+    def subscribe(self, since=None):
+        """Yield server-sent events for every entry after ``since``.
+
+        Without ``since`` the stream starts at the current end of the log.
+        A cursor that has been pruned gets a ``resync`` event and carries on
+        from the end, since the client has to reload anyway. Comments are
+        sent while idle so proxies keep the connection open and a closed
+        one is noticed.
+        """
+        self._start()
+        try:
+            yield f'retry: {RECONNECT_MS}\n\n'
+            with self.lock:
+                last = self.cursor if since is None else since
+            while True:
+                with self.lock:
+                    items = self._buffered(last)
+                    if items == []:
+                        self.updated.wait(HEARTBEAT_INTERVAL)
+                        items = self._buffered(last)
+                if items is None:
+                    # Too far behind for the buffer: catch up from the table.
+                    try:
+                        items = [(entry['id'], _event(entry)) for entry in self.read(last)]
+                    except CursorExpired:
+                        with self.lock:
+                            last = self.cursor
+                        yield f'id: {last}\nevent: resync\ndata: {{"cursor": {last}}}\n\n'
+                        continue
+                if items:
+                    last = items[-1][0]
+                    yield ''.join(frame for _, frame in items)
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            self._stop()
+
+
+change_feed = ChangeFeed()
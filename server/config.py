@@ -5,13 +5,61 @@ from flask_restful import Api
 from flask_sqlalchemy import SQLAlchemy
 from flask_session import Session
 from sqlalchemy import MetaData
+from instrumentation import init_instrumentation
+from database import database_url, engine_options, configure_engine
+from datetime import timedelta
 import os
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SESSION_TYPE'] = 'filesystem'
+# Sessions are signed cookies by default, so every worker and node can verify
+# them without shared storage. Setting SESSION_TYPE (e.g. redis) keeps them
+# server-side through Flask-Session instead.
+app.config['SESSION_TYPE'] = os.environ.get('SESSION_TYPE')
+app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=int(os.environ.get('SESSION_LIFETIME_HOURS', 12)))
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+if not app.config['SECRET_KEY']:
+    # Cookies signed with a per-process key don't survive restarts or work
+    # across workers, so set SECRET_KEY anywhere but local development.
+    app.logger.warning('SECRET_KEY is not set; using a random key for this process')
+    app.config['SECRET_KEY'] = os.urandom(32)
+# werkzeug hash method for new and upgraded passwords, e.g. pbkdf2:sha256:600000.
+# Stored hashes made with other parameters are rehashed at the next login.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+# Seconds check-auth may serve a staff record without reading the database.
+app.config['AUTH_CACHE_TTL'] = int(os.environ.get('AUTH_CACHE_TTL', 60))
+# Seconds a cached /rooms, /amenities or availability response may be served
+# for; 0 disables the cache. Committed writes from any process invalidate it
+# immediately (see cache.py).
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 30))
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))
+# Seconds the dashboard summary is reused for; it reads tables written all day,
+# so it expires rather than being invalidated by writes. 0 disables it.
+app.config['DASHBOARD_CACHE_TTL'] = int(os.environ.get('DASHBOARD_CACHE_TTL', 10))
+# Background sweeps (``flask run-sweeps``): how often each runs, how many rows
+# one short write transaction may touch, and when stays count as finished.
+app.config['SWEEP_INTERVAL'] = int(os.environ.get('SWEEP_INTERVAL', 300))
+app.config['SWEEP_BATCH_SIZE'] = int(os.environ.get('SWEEP_BATCH_SIZE', 500))
+app.config['SWEEP_WORKERS'] = int(os.environ.get('SWEEP_WORKERS', 2))
+# Hours after the check-out date a 'checked-in' stay is checked out, and after
+# the check-in date a 'confirmed' one becomes a no-show.
+app.config['CHECKOUT_GRACE_HOURS'] = int(os.environ.get('CHECKOUT_GRACE_HOURS', 12))
+app.config['NO_SHOW_GRACE_HOURS'] = int(os.environ.get('NO_SHOW_GRACE_HOURS', 24))
+# Open /changes/stream connections per process. Each one holds a worker
+# thread (a greenlet under gevent) until the client leaves, so
+# gunicorn.conf.py sets this from the worker class; clients turned away poll
+# /changes instead.
+app.config['CHANGE_STREAM_LIMIT'] = int(os.environ.get('CHANGE_STREAM_LIMIT', 100))
+# Days of change log and sweep history kept for clients and /sweeps.
+app.config['CHANGE_LOG_RETENTION_DAYS'] = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 7))
+app.config['SWEEP_HISTORY_DAYS'] = int(os.environ.get('SWEEP_HISTORY_DAYS', 30))
+# Per-request query counts and timings, Server-Timing headers and /metrics.
+app.config['INSTRUMENTATION'] = os.environ.get('INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+# /metrics is unauthenticated, for a scraper on a private network, so it is
+# only served when this is set as well.
+app.config['METRICS_ENDPOINT'] = os.environ.get('METRICS_ENDPOINT', '').lower() in ('1', 'true', 'yes')
 app.json.compact = False
 
 metadata = MetaData(naming_convention={
@@ -20,7 +68,13 @@ metadata = MetaData(naming_convention={
 db = SQLAlchemy(metadata=metadata)
 migrate = Migrate(app, db)
 db.init_app(app)
+with app.app_context():
+    configure_engine(db.engine)
 
-Session(app)
+if app.config['SESSION_TYPE']:
+    Session(app)
 api = Api(app)
-CORS(app, supports_credentials=True)
\ No newline at end of file
+CORS(app, supports_credentials=True, expose_headers=['X-Total-Count', 'X-Next-Cursor', 'Link', 'Server-Timing'])
+
+if app.config['INSTRUMENTATION']:
+    init_instrumentation(app)
\ No newline at end of file
@@ -0,0 +1,207 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import accumulate
+from sqlalchemy import case, delete, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from config import db
+from models import Room, Reservation, DailyOccupancy
+
+# Stays that earn revenue: upcoming, in progress and completed.
+REVENUE_STATUSES = ('confirmed', 'checked-in', 'checked-out')
+UPSERT_BATCH = 1000
+
+reservations = Reservation.__table__
+rooms = Room.__table__
+daily = DailyOccupancy.__table__
+
+
+def _day(value):
+    # SQLite returns date() as text, Postgres as a date.
+    return value if isinstance(value, date) else date.fromisoformat(value[:10])
+
+
+def _cents(price):
+    return round(price * 100)
+
+
+def stay_groups(start=None, end=None, room_types=None):
+    """Revenue-earning stays grouped by room type and dates.
+
+    Yields ``(room_type, first_night, checkout, stays, nightly_cents)``, with
+    the first night clipped to ``start`` when one is given. Grouping happens
+    in the database in one pass, so only one row per distinct (type, dates)
+    pair comes back.
+    """
+    first_night = func.date(Reservation.check_in_date)
+    if start is not None:
+        first_night = case((Reservation.check_in_date < start, start), else_=first_night)
+    checkout = func.date(Reservation.check_out_date)
+    query = (
+        select(Room.room_type, first_night, checkout, func.count(), func.sum(func.round(Room.price * 100)))
+        .join(Room, Room.id == Reservation.room_id)
+        .where(Reservation.status.in_(REVENUE_STATUSES))
+        .group_by(Room.room_type, first_night, checkout)
+    )
+    if start is not None:
+        query = query.where(Reservation.check_out_date > start)
+    if end is not None:
+        query = query.where(Reservation.check_in_date < end)
+    if room_types:
+        query = query.where(Room.room_type.in_(room_types))
+    for room_type, arrival, departure, stays, nightly in db.session.execute(query):
+        yield room_type, _day(arrival), _day(departure), stays, int(nightly)
+
+
+class Deltas:
+    """Changes to apply to ``daily_occupancy``, summed per (day, room_type)."""
+
+    def __init__(self):
+        self.cells = defaultdict(lambda: [0, 0])
+
+    def add_stay(self, room_type, cents, check_in, check_out, sign=1):
+        day, last = check_in.date(), check_out.date()
+        while day < last:
+            cell = self.cells[(day, room_type)]
+            cell[0] += sign
+            cell[1] += sign * cents
+            day += timedelta(days=1)
+
+    def apply(self, conn):
+        """Upsert the non-zero changes, in key order so concurrent writers can't deadlock."""
+        rows = [
+            {'day': day, 'room_type': room_type, 'nights_sold': nights, 'revenue_cents': cents}
+            for (day, room_type), (nights, cents) in sorted(self.cells.items())
+            if nights or cents
+        ]
+        if not rows:
+            return
+        insert = (postgresql if conn.dialect.name == 'postgresql' else sqlite).insert
+        stmt = insert(daily)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[daily.c.day, daily.c.room_type],
+            set_={
+                'nights_sold': daily.c.nights_sold + stmt.excluded.nights_sold,
+                'revenue_cents': daily.c.revenue_cents + stmt.excluded.revenue_cents,
+            },
+        )
+        for i in range(0, len(rows), UPSERT_BATCH):
+            conn.execute(stmt, rows[i:i + UPSERT_BATCH])
+
+
+def _room_info(conn, room_ids):
+    if not room_ids:
+        return {}
+    query = select(rooms.c.id, rooms.c.room_type, rooms.c.price).where(rooms.c.id.in_(room_ids))
+    return {room_id: (room_type, _cents(price)) for room_id, room_type, price in conn.execute(query)}
+
+
+def record_stays(conn, stays, sign=1):
+    """Count (or with ``sign=-1`` uncount) stays written outside the ORM.
+
+    ``stays`` are mappings with ``room_id``, ``check_in_date``,
+    ``check_out_date`` and ``status``, such as the rows of a bulk insert.
+    """
+    stays = [s for s in stays if s['status'] in REVENUE_STATUSES]
+    info = _room_info(conn, {s['room_id'] for s in stays})
+    deltas = Deltas()
+    for stay in stays:
+        if stay['room_id'] in info:
+            deltas.add_stay(*info[stay['room_id']], stay['check_in_date'], stay['check_out_date'], sign)
+    deltas.apply(conn)
+
+
+def _track_changes(session, flush_context, instances):
+    """Fold the reservations and rooms about to be flushed into the summary.
+
+    Old values are read from the database, which still holds them before the
+    flush, and new values from the objects, so changes to dates, status or
+    room, deletions (including cascades from a deleted guest) and room price
+    or type changes are all accounted for in the same transaction.
+    """
+    changed = [obj for obj in session.dirty if session.is_modified(obj)]
+    booked = [obj for obj in list(session.new) + changed + list(session.deleted) if isinstance(obj, Reservation)]
+    repriced = [obj for obj in changed + list(session.deleted) if isinstance(obj, Room) and obj.id is not None]
+    if not booked and not repriced:
+        return
+    conn = session.connection()
+    deltas = Deltas()
+
+    existing = [obj.id for obj in booked if obj.id is not None]
+    if existing:
+        old = conn.execute(
+            select(reservations.c.room_id, reservations.c.check_in_date,
+                   reservations.c.check_out_date, reservations.c.status)
+            .where(reservations.c.id.in_(existing))
+        ).all()
+        info = _room_info(conn, {row.room_id for row in old})
+        for row in old:
+            if row.status in REVENUE_STATUSES and row.room_id in info:
+                deltas.add_stay(*info[row.room_id], row.check_in_date, row.check_out_date, -1)
+
+    with session.no_autoflush:
+        for obj in booked:
+            if obj in session.deleted or obj.status not in REVENUE_STATUSES:
+                continue
+            room = session.get(Room, obj.room_id)
+            if room is not None and room not in session.deleted:
+                deltas.add_stay(room.room_type, _cents(room.price), obj.check_in_date, obj.check_out_date)
+
+    if repriced:
+        old_rooms = _room_info(conn, {room.id for room in repriced})
+        for room in repriced:
+            before = old_rooms.get(room.id)
+            after = None if room in session.deleted else (room.room_type, _cents(room.price))
+            if before == after:
+                continue
+            query = (
+                select(reservations.c.check_in_date, reservations.c.check_out_date, func.count())
+                .where(reservations.c.room_id == room.id, reservations.c.status.in_(REVENUE_STATUSES))
+                .group_by(reservations.c.check_in_date, reservations.c.check_out_date)
+            )
+            if existing:
+                # Those were already moved to the room's new values above.
+                query = query.where(reservations.c.id.notin_(existing))
+            for check_in, check_out, count in conn.execute(query):
+                if before:
+                    deltas.add_stay(before[0], before[1] * count, check_in, check_out, -1)
+                if after:
+                    deltas.add_stay(after[0], after[1] * count, check_in, check_out)
+
+    deltas.apply(conn)
+
+
+def init_occupancy_tracking():
+    if not event.contains(db.session, 'before_flush', _track_changes):
+        event.listen(db.session, 'before_flush', _track_changes)
+
+
+def rebuild():
+    """Recompute ``daily_occupancy`` from scratch, e.g. after a backfill or bulk load.
+
+    Stays are grouped in the database and spread over their nights with
+    difference arrays, so this costs one pass over ``reservations``.
+    """
+    deltas = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for room_type, arrival, departure, stays, cents in stay_groups():
+        for day, sign in ((arrival, 1), (departure, -1)):
+            cell = deltas[room_type][day]
+            cell[0] += sign * stays
+            cell[1] += sign * cents
+
+    rows = []
+    for room_type, changes in deltas.items():
+        days = sorted(changes)
+        nights = accumulate(changes[day][0] for day in days)
+        cents = accumulate(changes[day][1] for day in days)
+        for day, next_day, sold, earned in zip(days, days[1:], nights, cents):
+            # Totals hold from one change to the next.
+            while day < next_day:
+                if sold:
+                    rows.append({'day': day, 'room_type': room_type, 'nights_sold': sold, 'revenue_cents': earned})
+                day += timedelta(days=1)
+
+    db.session.execute(delete(daily))
+    for i in range(0, len(rows), UPSERT_BATCH):
+        db.session.execute(daily.insert(), rows[i:i + UPSERT_BATCH])
+    db.session.commit()
+    return len(rows)
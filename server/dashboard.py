@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case, exists, func, select
+from config import db
+from models import Guest, Room, Reservation, DailyOccupancy, room_amenities
+from availability import ACTIVE_STATUSES, overlap_clause
+
+LIST_SIZE = 5
+# Stays that never happened, so they are neither arrivals nor departures.
+CLOSED_STATUSES = ('cancelled', 'no-show')
+
+
+def _count(query):
+    return db.session.execute(query).scalar() or 0
+
+
+def dashboard_summary(today):
+    """Everything the admin dashboard shows, in a handful of aggregate queries.
+
+    Room state is answered by one indexed overlap probe per room, arrivals
+    through the check-in index and departures through the per-room
+    check-out index, so apart from the two table totals no query grows with
+    the reservation history. Revenue comes from ``daily_occupancy``.
+    """
+    start = datetime.combine(today, datetime.min.time())
+    tomorrow = start + timedelta(days=1)
+
+    occupied = exists().where(overlap_clause(start, tomorrow, room_id=Room.id))
+    in_house = exists().where(
+        Reservation.room_id == Room.id,
+        Reservation.check_in_date < tomorrow,
+        Reservation.check_out_date > start,
+        Reservation.status == 'checked-in',
+    )
+    by_status = db.session.execute(
+        select(
+            Room.status,
+            func.count(),
+            func.sum(case((occupied, 1), else_=0)),
+            func.sum(case((in_house, 1), else_=0)),
+        ).group_by(Room.status)
+    )
+    # SUM() comes back as Decimal on Postgres.
+    rooms = [
+        (status, count, int(booked or 0), int(checked_in or 0))
+        for status, count, booked, checked_in in by_status
+    ]
+    total_rooms = sum(row[1] for row in rooms)
+    occupied_rooms = sum(row[2] for row in rooms)
+
+    arrivals = db.session.execute(
+        select(func.count(), func.sum(case((Reservation.status != 'confirmed', 1), else_=0))).where(
+            Reservation.check_in_date >= start,
+            Reservation.check_in_date < tomorrow,
+            Reservation.status.notin_(CLOSED_STATUSES),
+        )
+    ).one()
+    # room_id IN (...) lets the planner walk the (room_id, check_out_date)
+    # index once per room instead of scanning every reservation.
+    departures = db.session.execute(
+        select(func.count(), func.sum(case((Reservation.status == 'checked-out', 1), else_=0))).where(
+            Reservation.room_id.in_(select(Room.id)),
+            Reservation.check_out_date >= start,
+            Reservation.check_out_date < tomorrow,
+            Reservation.status.notin_(CLOSED_STATUSES),
+        )
+    ).one()
+
+    revenue = db.session.execute(
+        select(
+            func.sum(case((DailyOccupancy.day == today, DailyOccupancy.revenue_cents), else_=0)),
+            func.sum(DailyOccupancy.revenue_cents),
+        ).where(DailyOccupancy.day >= today.replace(day=1), DailyOccupancy.day <= today)
+    ).one()
+
+    recent_guests = db.session.execute(
+        select(Guest.id, Guest.name, Guest.email, Guest.phone, Guest.created_at)
+        .order_by(Guest.id.desc())
+        .limit(LIST_SIZE)
+    ).all()
+    upcoming = db.session.execute(
+        select(
+            Reservation.id, Reservation.check_in_date, Reservation.check_out_date, Reservation.status,
+            Guest.name.label('guest'), Room.room_number,
+        )
+        .join(Guest, Guest.id == Reservation.guest_id)
+        .join(Room, Room.id == Reservation.room_id)
+        .where(Reservation.check_in_date >= start, Reservation.status.in_(ACTIVE_STATUSES))
+        .order_by(Reservation.check_in_date, Reservation.id)
+        .limit(LIST_SIZE)
+    ).all()
+
+    return {
+        'date': today.isoformat(),
+        'rooms': {
+            'total': total_rooms,
+            'occupied': occupied_rooms,
+            # Ready to let tonight: status 'available' and no stay overlapping it.
+            'vacant': sum(count - booked for status, count, booked, _ in rooms if status == 'available'),
+            'by_status': {status: count for status, count, _, _ in rooms},
+        },
+        'occupancy': round(occupied_rooms / total_rooms, 4) if total_rooms else None,
+        'arrivals': {'expected': arrivals[0], 'checked_in': int(arrivals[1] or 0)},
+        'departures': {'expected': departures[0], 'checked_out': int(departures[1] or 0)},
+        'guests': {
+            'total': _count(select(func.count()).select_from(Guest)),
+            'in_house': sum(row[3] for row in rooms),
+        },
+        'reservations': _count(select(func.count()).select_from(Reservation)),
+        'amenities': _count(select(func.count()).select_from(room_amenities)),
+        'revenue': {
+            'today': int(revenue[0] or 0) / 100,
+            'month_to_date': int(revenue[1] or 0) / 100,
+        },
+        'recent_guests': [
+            {
+                'id': row.id,
+                'name': row.name,
+                'email': row.email,
+                'phone': row.phone,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+            }
+            for row in recent_guests
+        ],
+        'upcoming_reservations': [
+            {
+                'id': row.id,
+                'guest': row.guest,
+                'room_number': row.room_number,
+                'check_in_date': row.check_in_date.isoformat(),
+                'check_out_date': row.check_out_date.isoformat(),
+                'status': row.status,
+            }
+            for row in upcoming
+        ],
+    }
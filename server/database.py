@@ -0,0 +1,76 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+DEFAULT_URL = 'sqlite:///app.db'
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+def database_url():
+    """The database to use, from ``DATABASE_URL`` (SQLite in the instance folder by default)."""
+    url = os.environ.get('DATABASE_URL', DEFAULT_URL)
+    # Hosting providers still hand out the postgres:// scheme SQLAlchemy dropped.
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _is_memory(url):
+    return url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+
+
+def engine_options(url):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for ``url``, tunable through the environment.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_TIMEOUT size the connection
+    pool. Server databases also get pre-ping (DB_POOL_PRE_PING) and
+    recycling (DB_POOL_RECYCLE, in seconds) so connections dropped by the
+    server or a proxy are replaced instead of failing a request. SQLite
+    waits up to SQLITE_BUSY_TIMEOUT milliseconds for the write lock.
+    """
+    url = make_url(url)
+    options = {}
+    if url.get_backend_name() == 'sqlite':
+        if _is_memory(url):
+            # Flask-SQLAlchemy pins in-memory databases to a single connection.
+            return options
+        options['connect_args'] = {'timeout': _env_int('SQLITE_BUSY_TIMEOUT', 5000) / 1000}
+    else:
+        options['pool_pre_ping'] = _env_flag('DB_POOL_PRE_PING', 'true')
+        options['pool_recycle'] = _env_int('DB_POOL_RECYCLE', 1800)
+    options['pool_size'] = _env_int('DB_POOL_SIZE', 10)
+    options['max_overflow'] = _env_int('DB_MAX_OVERFLOW', 20)
+    options['pool_timeout'] = _env_int('DB_POOL_TIMEOUT', 30)
+    return options
+
+
+def configure_engine(engine):
+    """Apply per-connection settings; SQLite pragmas are set on every connect.
+
+    WAL lets readers carry on while a booking holds the write lock, and
+    synchronous=NORMAL is durable under WAL except across power loss.
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT and
+    SQLITE_MMAP_SIZE (bytes, 0 to disable) override the defaults.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT', 5000),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    }
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
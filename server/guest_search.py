@@ -0,0 +1,134 @@
+import re
+from itertools import islice
+from sqlalchemy import case, cast, false, func, literal, literal_column, select, table, text
+from sqlalchemy.dialects.postgresql import TSQUERY
+from config import db
+from models import Guest
+from search_index import FTS_TABLE, POSTGRES_DOCUMENT
+
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+# Terms at least this long match few enough guests to rank them, and to read
+# them all from the index; shorter ones (a name's first letters, the "555"
+# every phone starts with) match so many that both cost more than the search.
+SELECTIVE_TERM_LENGTH = 4
+# How many whole-word matches, oldest first, are scored per search; a common
+# name has thousands, and scoring them all made typeahead slow.
+RANK_CANDIDATES = 100
+
+# Words as both indexes split them: letters and digits, plus '.', '_' and
+# '@' inside a word so an email is one term.
+TERM = re.compile(r'[^\W_][\w.@]*')
+
+guests_fts = table(FTS_TABLE, literal_column('rowid'))
+
+
+# Digits and phone punctuation only: search the bare-digits form instead, a
+# far more selective term than "555" on its own.
+PHONE = re.compile(r'[\d\s().+-]*\d[\d\s().+-]*')
+
+
+def search_terms(q):
+    q = q or ''
+    if PHONE.fullmatch(q.strip()):
+        return [re.sub(r'\D', '', q)]
+    return [term.lower() for term in TERM.findall(q)]
+
+
+def _postgres_query(terms, prefix):
+    # A tsquery literal rather than to_tsquery(), whose parser would split a
+    # half-typed email like "ann.smith@gm" differently from a whole one.
+    return ' & '.join(f"'{term}':*" if prefix else f"'{term}'" for term in terms)
+
+
+def _selective(terms):
+    return all(len(term) >= SELECTIVE_TERM_LENGTH for term in terms)
+
+
+def _postgres_matches(terms, prefix, *columns):
+    """A SELECT of ``columns`` for guests matching every term, in id order."""
+    # For ORDER BY id LIMIT n Postgres walks the primary key and tests each
+    # guest until n match: quick for common terms, most of the table for
+    # rare ones. Once a long term narrows the matches, "id + 0" hides the key
+    # so they are read from the GIN index and sorted instead.
+    narrow = any(len(term) >= SELECTIVE_TERM_LENGTH for term in terms)
+    return (
+        select(Guest.id, *columns)
+        .where(text(f'{POSTGRES_DOCUMENT} @@ CAST(:query AS tsquery)').bindparams(query=_postgres_query(terms, prefix)))
+        .order_by(Guest.id + 0 if narrow else Guest.id)
+    )
+
+
+def _prefix_ids(terms, limit):
+    """A SELECT of up to ``limit`` ids matching every term as a word prefix, in id order."""
+    if db.engine.dialect.name == 'postgresql':
+        return _postgres_matches(terms, True).limit(limit)
+    match = ' '.join(f'"{term}"*' for term in terms)
+    return (
+        select(literal_column('rowid'))
+        .select_from(guests_fts)
+        .where(text(f'{FTS_TABLE} MATCH :match').bindparams(match=match))
+        .order_by(literal_column('rowid'))
+        .limit(limit)
+    )
+
+
+def _best_ids(terms, limit):
+    """A SELECT of up to ``limit`` ids matching every term as a whole word, best first.
+
+    Only the first ``RANK_CANDIDATES`` matches are scored, by bm25 on SQLite
+    or ts_rank on Postgres, so the work stays bounded however many guests
+    share a name.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        query = cast(literal(_postgres_query(terms, prefix=False)), TSQUERY)
+        score = func.ts_rank(literal_column(POSTGRES_DOCUMENT), query).label('score')
+        candidates = _postgres_matches(terms, False, score).limit(RANK_CANDIDATES).subquery()
+        return select(candidates.c.id).order_by(candidates.c.score.desc(), candidates.c.id).limit(limit)
+    candidates = (
+        select(literal_column('rowid').label('id'), literal_column('rank').label('score'))
+        .select_from(guests_fts)
+        .where(text(f'{FTS_TABLE} MATCH :match').bindparams(match=' '.join(f'"{term}"' for term in terms)))
+        .order_by(literal_column('rowid'))
+        .limit(RANK_CANDIDATES)
+        .subquery()
+    )
+    return select(candidates.c.id).order_by(candidates.c.score, candidates.c.id).limit(limit)
+
+
+def _ranked_ids(terms, limit):
+    """Ids of up to ``limit`` guests matching ``terms``, best first.
+
+    Once every term is ``SELECTIVE_TERM_LENGTH`` characters or more, guests
+    matching them all as whole words come first (see ``_best_ids``), so a
+    typed-out email or name beats older guests who only share its prefix.
+    The rest are filled with prefix matches in id order, where the index
+    scan stops after ``limit`` rows.
+    """
+    exact = []
+    if _selective(terms):
+        exact = list(db.session.execute(_best_ids(terms, limit)).scalars())
+        if len(exact) >= limit:
+            return exact
+    seen = set(exact)
+    more = (guest_id for guest_id in db.session.execute(_prefix_ids(terms, limit)).scalars()
+            if guest_id not in seen)
+    return exact + list(islice(more, limit - len(exact)))
+
+
+def search_guests(query, q, limit=SEARCH_LIMIT):
+    """Narrow a SELECT over ``guests`` to at most ``limit`` guests matching every term in ``q``, best first.
+
+    Each term matches the start of a word in the name, email, phone (as
+    written or as bare digits) or ID number, case- and accent-insensitively,
+    so "ann smi" finds Ann Smith and "ann.smith@" her email. The search runs
+    against the FTS5 index on SQLite and a tsvector GIN index on Postgres,
+    and reads at most ``RANK_CANDIDATES`` whole-word and ``limit`` prefix
+    matches from it (see ``_ranked_ids``).
+    """
+    terms = search_terms(q)
+    ids = _ranked_ids(terms, limit) if terms else []
+    if not ids:
+        return query.where(false())
+    position = case({guest_id: i for i, guest_id in enumerate(ids)}, value=Guest.id)
+    return query.where(Guest.id.in_(ids)).order_by(position)
@@ -0,0 +1,69 @@
+"""Gunicorn settings for the API, tuned per database backend.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+SQLite allows one writer at a time, so it gets one process per CPU with
+threads for concurrency (sqlite3 releases the GIL while a query runs and
+WAL lets readers proceed during writes). Postgres gets the usual 2 x CPU + 1
+processes. WEB_CONCURRENCY, GUNICORN_THREADS, GUNICORN_WORKER_CLASS, PORT
+and GUNICORN_TIMEOUT override the defaults.
+
+GUNICORN_WORKER_CLASS=gevent switches to cooperative async I/O for
+read-heavy traffic (needs ``pip install gevent``, plus ``psycogreen`` on
+Postgres). It only helps on Postgres: SQLite queries block the event loop.
+It is also what to run when many screens follow /changes/stream, since an
+idle stream then costs a greenlet rather than one of a few threads.
+CHANGE_STREAM_LIMIT overrides how many streams each worker accepts.
+
+Send SIGHUP to the master to reload code and config gracefully: new workers
+boot while old ones finish their in-flight requests.
+"""
+import multiprocessing
+import os
+
+sqlite = os.environ.get('DATABASE_URL', 'sqlite:').startswith('sqlite')
+cpus = multiprocessing.cpu_count()
+
+bind = f'0.0.0.0:{os.environ.get("PORT", 5555)}'
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', cpus if sqlite else cpus * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# Every open /changes/stream holds a thread (or greenlet) for as long as the
+# screen stays open, so leave most of them to ordinary requests: half the
+# threads of a gthread worker, none of a sync one, and three quarters of a
+# gevent worker's connections. Clients turned away poll /changes instead.
+if worker_class == 'gevent':
+    stream_limit = worker_connections * 3 // 4
+elif worker_class == 'gthread':
+    stream_limit = threads // 2
+else:
+    stream_limit = 0
+os.environ.setdefault('CHANGE_STREAM_LIMIT', str(stream_limit))
+
+# Each worker imports the app itself so SIGHUP picks up new code; set
+# GUNICORN_PRELOAD=1 to fork workers from a preloaded master instead (less
+# memory, faster boot, but code changes then need a full restart). Workers
+# are recycled now and then to bound memory growth.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '').lower() in ('1', 'true', 'yes')
+max_requests = 5000
+max_requests_jitter = 500
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+
+
+def post_fork(server, worker):
+    # Connections opened in a preloading master must not be shared with the workers.
+    from config import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
+    if worker_class == 'gevent' and not sqlite:
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning('psycogreen is not installed; Postgres queries will block the event loop')
+        else:
+            patch_psycopg()
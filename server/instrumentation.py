@@ -0,0 +1,201 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('hotel.requests')
+
+SLOWEST_STATEMENTS = 3
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+
+class RequestStats:
+    """SQL and serialization costs accumulated while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.slowest = []
+
+    def record_query(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        self.slowest.append((elapsed, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[SLOWEST_STATEMENTS:]
+
+    def server_timing(self):
+        total = time.perf_counter() - self.started
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialize_time * 1000:.1f}, '
+            f'app;dur={total * 1000:.1f}'
+        )
+
+
+def current_stats():
+    return g.get('request_stats') if has_app_context() else None
+
+
+@contextmanager
+def serialization_timer():
+    """Time serialization work, excluding any SQL it runs along the way."""
+    stats = current_stats()
+    if stats is None:
+        yield
+        return
+    began, db_before = time.perf_counter(), stats.db_time
+    try:
+        yield
+    finally:
+        stats.serialize_time += (time.perf_counter() - began) - (stats.db_time - db_before)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        for bound, count in zip(self.buckets, self.counts):
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.total}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.total}'
+
+
+class Metrics:
+    """Per-route histograms rendered in the Prometheus text format."""
+
+    FAMILIES = {
+        'http_request_duration_seconds': ('Time to serve a request, including streaming', LATENCY_BUCKETS),
+        'http_request_db_seconds': ('Time spent in SQL per request', LATENCY_BUCKETS),
+        'http_request_serialize_seconds': ('Time spent serializing per request', LATENCY_BUCKETS),
+        'http_request_queries': ('SQL statements executed per request', QUERY_BUCKETS),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, method, route, stats, elapsed):
+        values = {
+            'http_request_duration_seconds': elapsed,
+            'http_request_db_seconds': stats.db_time,
+            'http_request_serialize_seconds': stats.serialize_time,
+            'http_request_queries': stats.queries,
+        }
+        with self.lock:
+            for name, value in values.items():
+                key = (name, method, route)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(self.FAMILIES[name][1])
+                self.histograms[key].observe(value)
+
+    def render(self):
+        out = []
+        with self.lock:
+            for name, (help_text, _) in self.FAMILIES.items():
+                out.append(f'# HELP {name} {help_text}')
+                out.append(f'# TYPE {name} histogram')
+                for (family, method, route), histogram in sorted(self.histograms.items()):
+                    if family == name:
+                        labels = f'method="{method}",route="{route}"'
+                        out.extend(histogram.lines(name, labels))
+        return '\n'.join(out) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record_query(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute never runs for a failed statement; drop its start
+    # time so the next statement on the connection isn't timed from it.
+    conn = exception_context.connection
+    if conn is not None and exception_context.execution_context is not None:
+        started = conn.info.get('query_started')
+        if started:
+            started.pop()
+
+
+def init_instrumentation(app):
+    """Record SQL and serialization costs for every request served by ``app``.
+
+    Each response carries a ``Server-Timing`` header (for streamed bodies it
+    covers the work done before the first byte). Once the body has been
+    sent, a JSON log line is written to the ``hotel.requests`` logger and the
+    per-route histograms are updated. They are served at ``/metrics`` only
+    when ``METRICS_ENDPOINT`` is set.
+    """
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+        logger.setLevel(logging.INFO)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def report_request_stats(response):
+        stats = g.get('request_stats')
+        if stats is None:
+            return response
+        response.headers['Server-Timing'] = stats.server_timing()
+        method = request.method
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        status = response.status_code
+
+        def finish():
+            elapsed = time.perf_counter() - stats.started
+            metrics.observe(method, route, stats, elapsed)
+            logger.info(json.dumps({
+                'method': method,
+                'route': route,
+                'status': status,
+                'duration_ms': round(elapsed * 1000, 2),
+                'queries': stats.queries,
+                'db_ms': round(stats.db_time * 1000, 2),
+                'serialize_ms': round(stats.serialize_time * 1000, 2),
+                'slowest': [
+                    {'ms': round(t * 1000, 2), 'sql': ' '.join(sql.split())[:200]}
+                    for t, sql in stats.slowest
+                ],
+            }))
+
+        response.call_on_close(finish)
+        return response
+
+    if app.config.get('METRICS_ENDPOINT'):
+        @app.route('/metrics')
+        def metrics_endpoint():
+            return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
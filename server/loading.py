@@ -0,0 +1,92 @@
+from sqlalchemy.orm import joinedload, selectinload
+from models import Guest, Room, Reservation
+from instrumentation import serialization_timer
+
+GUEST_FIELDS = ('id', 'name', 'email', 'phone', 'address', 'id_type', 'id_number')
+ROOM_FIELDS = ('id', 'room_number', 'room_type', 'price', 'capacity', 'status', 'version')
+RESERVATION_FIELDS = ('id', 'guest_id', 'room_id', 'check_in_date', 'check_out_date', 'status', 'special_requests', 'version')
+AMENITY_FIELDS = ('id', 'name', 'description')
+
+
+def _nested(prefix, *groups):
+    return tuple(f'{prefix}.{field}' for group in groups for field in group)
+
+
+class LoadProfile:
+    """Eager-loading and serialization plan for one resource.
+
+    ``relations`` maps each expandable relationship to the loader options that
+    fetch it (plus anything nested beneath it) and the dotted field names it
+    contributes to ``to_dict(only=...)``. Every relationship is loaded with
+    joinedload or selectinload, so the number of queries per request is
+    fixed no matter how many rows are returned.
+
+    Without ``?expand`` the full default representation is produced, as
+    before. ``?expand=guest,room`` includes only the named relationships and
+    ``?expand=`` returns a shallow row.
+    """
+
+    def __init__(self, fields, relations):
+        self.fields = fields
+        self.relations = relations
+        self._only = {}
+
+    def parse(self, args):
+        if 'expand' not in args:
+            return None
+        names = frozenset(n.strip() for n in args.get('expand').split(',') if n.strip())
+        unknown = names - set(self.relations)
+        if unknown:
+            raise ValueError(f'Cannot expand {", ".join(sorted(unknown))}')
+        return names
+
+    def options(self, expand=None):
+        names = self.relations if expand is None else expand
+        return [option for name in names for option in self.relations[name][0]]
+
+    def only(self, expand):
+        if expand not in self._only:
+            fields = self.fields
+            for name in sorted(expand):
+                fields += self.relations[name][1]
+            self._only[expand] = fields
+        return self._only[expand]
+
+    def serialize(self, obj, expand=None):
+        with serialization_timer():
+            if expand is None:
+                return obj.to_dict()
+            return obj.to_dict(only=self.only(expand))
+
+
+guest_profile = LoadProfile(GUEST_FIELDS, {
+    'reservations': (
+        [selectinload(Guest.reservations).joinedload(Reservation.room).selectinload(Room.amenities)],
+        _nested('reservations', RESERVATION_FIELDS)
+        + _nested('reservations.room', ROOM_FIELDS)
+        + _nested('reservations.room.amenities', AMENITY_FIELDS),
+    ),
+})
+
+room_profile = LoadProfile(ROOM_FIELDS, {
+    'amenities': (
+        [selectinload(Room.amenities)],
+        _nested('amenities', AMENITY_FIELDS),
+    ),
+    'reservations': (
+        [selectinload(Room.reservations).joinedload(Reservation.guest)],
+        _nested('reservations', RESERVATION_FIELDS)
+        + _nested('reservations.guest', GUEST_FIELDS),
+    ),
+})
+
+reservation_profile = LoadProfile(RESERVATION_FIELDS, {
+    'guest': (
+        [joinedload(Reservation.guest)],
+        _nested('guest', GUEST_FIELDS),
+    ),
+    'room': (
+        [joinedload(Reservation.room).selectinload(Room.amenities)],
+        _nested('room', ROOM_FIELDS) + _nested('room.amenities', AMENITY_FIELDS),
+    ),
+})
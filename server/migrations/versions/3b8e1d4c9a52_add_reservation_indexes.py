@@ -0,0 +1,30 @@
+"""add reservation indexes
+
+Revision ID: 3b8e1d4c9a52
+Revises: 2c199ae7557c
+Create Date: 2026-10-18 09:12:41.227310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e1d4c9a52'
+down_revision = '2c199ae7557c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.create_index('ix_reservations_room_dates_status', ['room_id', 'check_out_date', 'check_in_date', 'status'], unique=False)
+        batch_op.create_index('ix_reservations_guest_id_check_in_date', ['guest_id', 'check_in_date'], unique=False)
+        batch_op.create_index('ix_reservations_check_in_date_status', ['check_in_date', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservations_check_in_date_status')
+        batch_op.drop_index('ix_reservations_guest_id_check_in_date')
+        batch_op.drop_index('ix_reservations_room_dates_status')
@@ -0,0 +1,30 @@
+"""add daily occupancy
+
+Revision ID: 5d2f7a1e8c31
+Revises: 3b8e1d4c9a52
+Create Date: 2026-10-18 19:20:05.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2f7a1e8c31'
+down_revision = '3b8e1d4c9a52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_occupancy',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('room_type', sa.String(), nullable=False),
+    sa.Column('nights_sold', sa.Integer(), nullable=False),
+    sa.Column('revenue_cents', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'room_type')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_occupancy')
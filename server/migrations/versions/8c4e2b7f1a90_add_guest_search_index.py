@@ -0,0 +1,31 @@
+"""add guest search index
+
+Revision ID: 8c4e2b7f1a90
+Revises: 5d2f7a1e8c31
+Create Date: 2026-10-18 21:04:37.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search_index import create_search_index, drop_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2b7f1a90'
+down_revision = '5d2f7a1e8c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_guests_email_lower', 'guests', [sa.text('lower(email)')], unique=False)
+
+    # Shared with create_all() (see search_index.py).
+    create_search_index(op.get_bind())
+
+
+def downgrade():
+    drop_search_index(op.get_bind())
+
+    op.drop_index('ix_guests_email_lower', table_name='guests')
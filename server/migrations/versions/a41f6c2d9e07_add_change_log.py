@@ -0,0 +1,33 @@
+"""add change log
+
+Revision ID: a41f6c2d9e07
+Revises: 8c4e2b7f1a90
+Create Date: 2026-10-18 22:12:40.306817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f6c2d9e07'
+down_revision = '8c4e2b7f1a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=True),
+    sa.Column('op', sa.String(), nullable=False),
+    sa.Column('data', sa.Text(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+
+
+def downgrade():
+    op.drop_table('change_log')
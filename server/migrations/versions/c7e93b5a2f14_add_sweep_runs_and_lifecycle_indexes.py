@@ -0,0 +1,50 @@
+"""add sweep runs and lifecycle indexes
+
+Revision ID: c7e93b5a2f14
+Revises: a41f6c2d9e07
+Create Date: 2026-10-18 23:02:11.640285
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e93b5a2f14'
+down_revision = 'a41f6c2d9e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sweep_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sweep', sa.String(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('duration_ms', sa.Float(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('batches', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sweep_runs', schema=None) as batch_op:
+        batch_op.create_index('ix_sweep_runs_sweep_started_at', ['sweep', 'started_at'], unique=False)
+
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.create_index('ix_reservations_checked_in_check_out', ['status', 'check_out_date'], unique=False,
+                              sqlite_where=sa.text("status = 'checked-in'"),
+                              postgresql_where=sa.text("status = 'checked-in'"))
+        batch_op.create_index('ix_reservations_confirmed_check_in', ['status', 'check_in_date'], unique=False,
+                              sqlite_where=sa.text("status = 'confirmed'"),
+                              postgresql_where=sa.text("status = 'confirmed'"))
+
+
+def downgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservations_confirmed_check_in')
+        batch_op.drop_index('ix_reservations_checked_in_check_out')
+
+    with op.batch_alter_table('sweep_runs', schema=None) as batch_op:
+        batch_op.drop_index('ix_sweep_runs_sweep_started_at')
+
+    op.drop_table('sweep_runs')
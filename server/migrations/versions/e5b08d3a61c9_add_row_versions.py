@@ -0,0 +1,33 @@
+"""add row versions to rooms and reservations
+
+Revision ID: e5b08d3a61c9
+Revises: c7e93b5a2f14
+Create Date: 2026-10-18 23:41:52.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b08d3a61c9'
+down_revision = 'c7e93b5a2f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant default, so existing rows start at version 1 without a rewrite.
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,28 @@
+"""add cache generations
+
+Revision ID: f3a9c1e7b254
+Revises: e5b08d3a61c9
+Create Date: 2026-10-19 10:12:37.402915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c1e7b254'
+down_revision = 'e5b08d3a61c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cache_generations',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('generation', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+
+
+def downgrade():
+    op.drop_table('cache_generations')
@@ -1,6 +1,9 @@
 from config import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from auth import hash_password, needs_rehash
 from sqlalchemy_serializer import SerializerMixin
+from sqlalchemy import event
+from search_index import create_search_index
 
 class Guest(db.Model, SerializerMixin):
     __tablename__ = 'guests'
@@ -15,13 +18,22 @@ class Guest(db.Model, SerializerMixin):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
-    reservations = db.relationship('Reservation', backref='guest', cascade='all, delete-orphan')
+    reservations = db.relationship('Reservation', backref='guest', cascade='all, delete-orphan', order_by='Reservation.id')
     
+    __table_args__ = (
+        # Case-insensitive email lookups: lower(email) = lower(?)
+        db.Index('ix_guests_email_lower', db.func.lower(email)),
+    )
+
     serialize_rules = ('-reservations.guest', '-created_at', '-updated_at')
     
     def __repr__(self):
         return f'<Guest {self.name}>'
 
+# The search index isn't part of the model, so create_all() builds it the way
+# the migration does.
+event.listen(Guest.__table__, 'after_create', lambda target, connection, **kw: create_search_index(connection))
+
 class Room(db.Model, SerializerMixin):
     __tablename__ = 'rooms'
     
@@ -31,9 +43,13 @@ class Room(db.Model, SerializerMixin):
     price = db.Column(db.Float, nullable=False)
     capacity = db.Column(db.Integer, nullable=False)
     status = db.Column(db.String, default='available')
+    # Bumped by every update; a write made against an older version is a conflict.
+    version = db.Column(db.Integer, nullable=False, server_default='1')
     
-    reservations = db.relationship('Reservation', backref='room')
-    amenities = db.relationship('Amenity', secondary='room_amenities', backref='rooms')
+    reservations = db.relationship('Reservation', backref='room', order_by='Reservation.id')
+    amenities = db.relationship('Amenity', secondary='room_amenities', backref='rooms', order_by='Amenity.id')
+    
+    __mapper_args__ = {'version_id_col': version}
     
     serialize_rules = ('-reservations.room', '-amenities.rooms')
 
@@ -47,6 +63,23 @@ class Reservation(db.Model, SerializerMixin):
     check_out_date = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String, default='confirmed')
     special_requests = db.Column(db.String)
+    # Bumped by every update; a write made against an older version is a conflict.
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    
+    __table_args__ = (
+        # Overlap probes: room_id = ? AND check_out_date > ? AND check_in_date < ?
+        db.Index('ix_reservations_room_dates_status', 'room_id', 'check_out_date', 'check_in_date', 'status'),
+        db.Index('ix_reservations_guest_id_check_in_date', 'guest_id', 'check_in_date'),
+        # Upcoming check-ins ordered by date
+        db.Index('ix_reservations_check_in_date_status', 'check_in_date', 'status'),
+        # Lifecycle sweeps: only open stays are indexed (see sweeps.py). status
+        # leads so SQLite ranks them above the check-in index for the sweeps.
+        db.Index('ix_reservations_checked_in_check_out', 'status', 'check_out_date',
+                 sqlite_where=db.text("status = 'checked-in'"), postgresql_where=db.text("status = 'checked-in'")),
+        db.Index('ix_reservations_confirmed_check_in', 'status', 'check_in_date',
+                 sqlite_where=db.text("status = 'confirmed'"), postgresql_where=db.text("status = 'confirmed'")),
+    )
+    __mapper_args__ = {'version_id_col': version}
     
     serialize_rules = ('-guest.reservations', '-room.reservations')
 
@@ -70,14 +103,62 @@ class Staff(db.Model, SerializerMixin):
     is_admin = db.Column(db.Boolean, default=False)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
+
+    def needs_rehash(self):
+        return needs_rehash(self.password_hash)
     
     serialize_rules = ('-password_hash',)
 
 room_amenities = db.Table('room_amenities',
     db.Column('room_id', db.Integer, db.ForeignKey('rooms.id'), primary_key=True),
     db.Column('amenity_id', db.Integer, db.ForeignKey('amenities.id'), primary_key=True)
-)
\ No newline at end of file
+)
+class DailyOccupancy(db.Model):
+    """Nights sold and revenue per room type per night, kept up to date by daily_occupancy.py."""
+    __tablename__ = 'daily_occupancy'
+    
+    day = db.Column(db.Date, primary_key=True)
+    room_type = db.Column(db.String, primary_key=True)
+    nights_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue_cents = db.Column(db.BigInteger, nullable=False, default=0)
+
+class ChangeLog(db.Model):
+    """Append-only record of room and reservation writes, read by changes.py."""
+    __tablename__ = 'change_log'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String, nullable=False)
+    entity_id = db.Column(db.Integer)
+    op = db.Column(db.String, nullable=False)
+    data = db.Column(db.Text)
+    changed_at = db.Column(db.DateTime, server_default=db.func.now())
+    
+    # AUTOINCREMENT so ids (the clients' cursors) never repeat once old entries are pruned.
+    __table_args__ = {'sqlite_autoincrement': True}
+
+class SweepRun(db.Model):
+    """One run of a background sweep, for /sweeps (see sweeps.py)."""
+    __tablename__ = 'sweep_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sweep = db.Column(db.String, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    duration_ms = db.Column(db.Float, nullable=False)
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String)
+    
+    __table_args__ = (
+        db.Index('ix_sweep_runs_sweep_started_at', 'sweep', 'started_at'),
+    )
+
+class CacheGeneration(db.Model):
+    """How many times each table has been written, shared by every process for cache.py."""
+    __tablename__ = 'cache_generations'
+    
+    table_name = db.Column(db.String, primary_key=True)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,80 @@
+from datetime import timedelta
+from sqlalchemy import select
+from config import db
+from models import Room, Reservation, Guest
+from availability import overlap_clause
+
+MAX_CALENDAR_DAYS = 366
+
+
+def _runs(cells):
+    """Run-length encode ``cells`` as ``[[count, value], ...]``."""
+    runs = []
+    for value in cells:
+        if runs and runs[-1][1] == value:
+            runs[-1][0] += 1
+        else:
+            runs.append([1, value])
+    return runs
+
+
+def occupancy_calendar(start, days, room_ids=None):
+    """Build the room x day occupancy grid for ``days`` nights from ``start``.
+
+    Rooms and the active reservations overlapping the window are read in one
+    outer-joined query. Each room row is run-length encoded as
+    ``[[nights, booking], ...]`` where ``booking`` indexes ``reservations``
+    (or is null for a free night), so the payload grows with rooms x window
+    rather than with the reservation history.
+    """
+    end = start + timedelta(days=days)
+    overlap = overlap_clause(start, end, room_id=Room.id)
+    query = (
+        select(
+            Room.id, Room.room_number, Room.room_type, Room.status,
+            Reservation.id.label('reservation_id'),
+            Reservation.check_in_date, Reservation.check_out_date,
+            Reservation.status.label('reservation_status'),
+            Guest.name.label('guest'),
+        )
+        .outerjoin(Reservation, overlap)
+        .outerjoin(Guest, Guest.id == Reservation.guest_id)
+        .order_by(Room.id, Reservation.check_in_date, Reservation.id)
+    )
+    if room_ids:
+        query = query.where(Room.id.in_(room_ids))
+
+    rooms, reservations, cells = [], [], None
+    for row in db.session.execute(query):
+        if not rooms or rooms[-1]['id'] != row.id:
+            if cells is not None:
+                rooms[-1]['runs'] = _runs(cells)
+            rooms.append({
+                'id': row.id,
+                'room_number': row.room_number,
+                'room_type': row.room_type,
+                'status': row.status,
+            })
+            cells = [None] * days
+        if row.reservation_id is None:
+            continue
+        index = len(reservations)
+        reservations.append({
+            'id': row.reservation_id,
+            'guest': row.guest,
+            'status': row.reservation_status,
+        })
+        first = max((row.check_in_date.date() - start).days, 0)
+        last = min((row.check_out_date.date() - start).days, days)
+        for day in range(first, last):
+            if cells[day] is None:
+                cells[day] = index
+    if cells is not None:
+        rooms[-1]['runs'] = _runs(cells)
+
+    return {
+        'start': start.isoformat(),
+        'days': days,
+        'rooms': rooms,
+        'reservations': reservations,
+    }
@@ -0,0 +1,205 @@
+import base64
+import json
+from datetime import date, datetime
+from urllib.parse import urlencode
+from sqlalchemy import Select, and_, func, or_, select
+from config import db
+
+# Query string conventions follow json-server, which the React client already
+# speaks: ?_sort=a,b&_order=asc,desc&_limit=5&_page=2 plus <field>_gte style
+# range filters. ?_cursor=<token> switches from offset to keyset pagination.
+OPERATORS = {
+    '_gte': lambda col, value: col >= value,
+    '_lte': lambda col, value: col <= value,
+    '_gt': lambda col, value: col > value,
+    '_lt': lambda col, value: col < value,
+    '_ne': lambda col, value: col != value,
+}
+
+MAX_LIMIT = 1000
+
+# Unpaginated Core queries are streamed from a server-side cursor in chunks of
+# this many rows instead of being fetched whole.
+STREAM_BATCH = 1000
+
+
+def _coerce(column, value):
+    if isinstance(column.type, (db.DateTime, db.Date)):
+        if value == 'today':
+            return datetime.combine(date.today(), datetime.min.time())
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, db.Boolean):
+        return value.lower() in ('1', 'true', 'yes')
+    return column.type.python_type(value)
+
+
+def _comparable(value):
+    # SQLite keeps DateTime columns as text, and rows filled by a
+    # CURRENT_TIMESTAMP server default lack the microseconds SQLAlchemy writes,
+    # so compare a normalised rendering when paging by a timestamp.
+    if db.engine.dialect.name == 'sqlite' and (
+        isinstance(value, datetime) or isinstance(getattr(value, 'type', None), db.DateTime)
+    ):
+        return func.strftime('%Y-%m-%d %H:%M:%f', value)
+    return value
+
+
+def _encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(token, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    return [
+        v if v is None or isinstance(v, (int, float)) else _coerce(col, v)
+        for col, v in zip(columns, values)
+    ]
+
+
+def _int_arg(args, name, minimum):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if value < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    return value
+
+
+class ListQuery:
+    """Sorting, filtering and pagination for a collection resource.
+
+    ``fields`` whitelists the columns that may be filtered and sorted on.
+    ``apply`` pushes everything into SQL and returns the page of rows plus the
+    response headers describing it (``X-Total-Count``, ``X-Next-Cursor`` and
+    a ``Link`` header), so the JSON body stays a plain array.
+    """
+
+    def __init__(self, model, fields, default_sort='id'):
+        self.model = model
+        self.columns = {name: getattr(model, name) for name in fields}
+        self.default_sort = default_sort
+
+    def filters(self, args):
+        clauses = []
+        for key in args:
+            name, op = key, None
+            for suffix in OPERATORS:
+                if key.endswith(suffix):
+                    name, op = key[:-len(suffix)], suffix
+                    break
+            column = self.columns.get(name)
+            if column is None:
+                continue
+            try:
+                values = [_coerce(column, v) for v in args.getlist(key)]
+            except ValueError:
+                raise ValueError(f'Invalid value for {key}')
+            if op:
+                clauses.extend(OPERATORS[op](column, v) for v in values)
+            elif len(values) == 1:
+                clauses.append(column == values[0])
+            else:
+                clauses.append(column.in_(values))
+        return clauses
+
+    def ordering(self, args):
+        names = [n for n in args.get('_sort', self.default_sort).split(',') if n]
+        orders = [o.lower() for o in args.get('_order', '').split(',') if o]
+        keys = []
+        for i, name in enumerate(names):
+            if name not in self.columns:
+                raise ValueError(f'Cannot sort by {name}')
+            order = orders[i] if i < len(orders) else (orders[-1] if orders else 'asc')
+            if order not in ('asc', 'desc'):
+                raise ValueError('_order must be asc or desc')
+            keys.append((self.columns[name], order == 'desc'))
+        pk = self.model.id
+        if not any(col is pk for col, _ in keys):
+            # Tie-break on the primary key so pages and cursors are stable.
+            keys.append((pk, keys[-1][1] if keys else False))
+        return keys
+
+    @staticmethod
+    def _after(keys, values):
+        keys = [(_comparable(col), desc) for col, desc in keys]
+        values = [_comparable(v) if isinstance(v, datetime) else v for v in values]
+        branches = []
+        for i, (col, desc) in enumerate(keys):
+            equal = [k == v for (k, _), v in zip(keys[:i], values[:i])]
+            step = col < values[i] if desc else col > values[i]
+            branches.append(and_(*equal, step))
+        return or_(*branches)
+
+    def apply(self, query, args, url=None):
+        """Filter, sort and paginate ``query`` according to ``args``.
+
+        ``query`` may be an ORM ``Query`` (rows are model instances) or a Core
+        ``select()`` over the model's table (rows are result rows). Without
+        ``_limit`` a Core query comes back as an unbuffered result to iterate
+        once, so exports never hold the whole table in memory.
+        """
+        limit = _int_arg(args, '_limit', 1)
+        if limit is not None:
+            limit = min(limit, MAX_LIMIT)
+        page = _int_arg(args, '_page', 1)
+        start = _int_arg(args, '_start', 0)
+        cursor = args.get('_cursor')
+        if cursor is not None and limit is None:
+            raise ValueError('_cursor requires _limit')
+
+        filters = self.filters(args)
+        keys = self.ordering(args)
+        query = query.filter(*filters)
+        headers = {}
+
+        if limit is not None and not cursor:
+            total = db.session.execute(
+                select(func.count()).select_from(query.order_by(None).subquery())
+            ).scalar()
+            headers['X-Total-Count'] = str(total)
+
+        query = query.order_by(*(col.desc() if desc else col.asc() for col, desc in keys))
+        if cursor:
+            values = _decode_cursor(cursor, [col for col, _ in keys])
+            query = query.filter(self._after(keys, values))
+        elif start is not None:
+            query = query.offset(start)
+        elif page is not None and limit is not None:
+            query = query.offset((page - 1) * limit)
+
+        if limit is None:
+            if isinstance(query, Select):
+                return db.session.execute(query.execution_options(yield_per=STREAM_BATCH)), headers
+            return query.all(), headers
+
+        rows = _fetch(query.limit(limit + 1))
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            token = _encode_cursor([getattr(last, col.key) for col, _ in keys])
+            headers['X-Next-Cursor'] = token
+            if url:
+                headers['Link'] = f'<{url}?{_replace(args, _cursor=token)}>; rel="next"'
+        return rows, headers
+
+
+def _fetch(query):
+    if isinstance(query, Select):
+        return db.session.execute(query).all()
+    return query.all()
+
+
+def _replace(args, **params):
+    items = [(k, v) for k, v in args.items(multi=True) if k not in params and k not in ('_page', '_start')]
+    items.extend(params.items())
+    return urlencode(items)
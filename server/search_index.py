@@ -0,0 +1,80 @@
+"""The guest search index, which lives outside the models.
+
+SQLite gets an FTS5 table kept in step by triggers, Postgres a GIN index on
+a tsvector expression. Neither can be declared on the ``Guest`` model, so
+the add_guest_search_index migration and ``create_all()`` both build them
+from here, and migrations/env.py keeps autogenerate from dropping them.
+"""
+
+# Phone numbers are indexed as written and as bare digits, so both
+# "555-0142" and "5550142" find them. Emails stay whole words ('.', '_' and
+# '@' are word characters), so typing one out narrows to it rather than to
+# everyone at gmail.com. Keep in step with guest_search.py.
+SQLITE_DIGITS = "replace(replace(replace(replace(replace(replace({0}, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', '')"
+SQLITE_PHONE = "{0} || ' ' || " + SQLITE_DIGITS
+POSTGRES_DOCUMENT = (
+    "to_tsvector('simple'::regconfig, "
+    "regexp_replace(name || ' ' || email || ' ' || phone || ' ' || id_number, '[^[:alnum:]._@]+', ' ', 'g')"
+    " || ' ' || regexp_replace(phone, '[^0-9]+', '', 'g'))"
+)
+
+FTS_TABLE = 'guests_fts'
+POSTGRES_INDEX = 'ix_guests_search'
+
+
+def _sqlite_row(prefix):
+    columns = [f'{prefix}.name', f'{prefix}.email', SQLITE_PHONE.format(f'{prefix}.phone'), f'{prefix}.id_number']
+    return ', '.join(columns)
+
+
+def is_search_index(name, type_):
+    """Whether a reflected table or index belongs to the search index (FTS5 adds shadow tables)."""
+    if type_ == 'table':
+        return name == FTS_TABLE or name.startswith(f'{FTS_TABLE}_')
+    return type_ == 'index' and name == POSTGRES_INDEX
+
+
+def create_search_index(conn):
+    """Build the index on ``conn`` and fill it from existing guests; a no-op if it exists."""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).first()
+        if exists:
+            return
+        # Contentless: the index holds only terms and guest ids, and triggers
+        # keep it in step with every write, ORM or bulk.
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "name, email, phone, id_number, content='', "
+            "tokenize=\"unicode61 remove_diacritics 2 tokenchars '._@'\", prefix='1 2 3')"
+        )
+        insert = f"INSERT INTO {FTS_TABLE}(rowid, name, email, phone, id_number) VALUES (new.id, {_sqlite_row('new')});"
+        delete = (
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email, phone, id_number) "
+            f"VALUES ('delete', old.id, {_sqlite_row('old')});"
+        )
+        conn.exec_driver_sql(f"CREATE TRIGGER guests_fts_insert AFTER INSERT ON guests BEGIN {insert} END")
+        conn.exec_driver_sql(f"CREATE TRIGGER guests_fts_delete AFTER DELETE ON guests BEGIN {delete} END")
+        conn.exec_driver_sql(
+            "CREATE TRIGGER guests_fts_update AFTER UPDATE OF name, email, phone, id_number ON guests "
+            f"BEGIN {delete} {insert} END"
+        )
+        conn.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, email, phone, id_number) "
+            f"SELECT guests.id, {_sqlite_row('guests')} FROM guests"
+        )
+    elif dialect == 'postgresql':
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} ON guests USING gin ({POSTGRES_DOCUMENT})")
+
+
+def drop_search_index(conn):
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS guests_fts_update")
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS guests_fts_delete")
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS guests_fts_insert")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif dialect == 'postgresql':
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {POSTGRES_INDEX}")
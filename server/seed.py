@@ -1,23 +1,51 @@
+import argparse
+import random
+import time
+from itertools import islice
 from config import app, db
-from models import Guest, Room, Reservation, Amenity, Staff
+from models import Guest, Room, Reservation, Amenity, Staff, DailyOccupancy, ChangeLog, room_amenities
+import daily_occupancy
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
-from sqlalchemy import text  # Add this import
+from faker import Faker
+from sqlalchemy import insert, text  # Add this import
+
+INSERT_BATCH = 10000
+
+AMENITIES = [
+    ("WiFi", "High-speed internet access"),
+    ("Pool", "Outdoor swimming pool"),
+    ("Gym", "24-hour fitness center"),
+    ("Spa", "Full-service spa"),
+    ("Breakfast", "Complimentary breakfast"),
+]
+
+# room_type: (price, capacity, share of rooms, chance of each non-WiFi amenity)
+ROOM_TYPES = {
+    "Standard": (99.99, 2, 0.6, 0.3),
+    "Deluxe": (149.99, 3, 0.3, 0.6),
+    "Suite": (249.99, 4, 0.1, 1.0),
+}
+
+def clear_data():
+    print("Deleting all records...")
+    # Clear all data in proper order to avoid foreign key conflicts
+    db.session.query(DailyOccupancy).delete()
+    db.session.query(ChangeLog).delete()
+    db.session.query(Reservation).delete()
+    db.session.query(Guest).delete()
+    db.session.query(Staff).delete()
+    
+    # Clear the room_amenities association table with proper text() wrapper
+    db.session.execute(text('DELETE FROM room_amenities'))
+    
+    db.session.query(Room).delete()
+    db.session.query(Amenity).delete()
+    db.session.commit()
 
 def seed_data():
     with app.app_context():
-        print("Deleting all records...")
-        # Clear all data in proper order to avoid foreign key conflicts
-        db.session.query(Reservation).delete()
-        db.session.query(Guest).delete()
-        db.session.query(Staff).delete()
-        
-        # Clear the room_amenities association table with proper text() wrapper
-        db.session.execute(text('DELETE FROM room_amenities'))
-        
-        db.session.query(Room).delete()
-        db.session.query(Amenity).delete()
-        db.session.commit()
+        clear_data()
 
         print("Creating initial admin...")
         if not Staff.query.filter_by(email='admin@hotel.com').first():
@@ -159,7 +187,165 @@ def seed_data():
         db.session.add_all(reservations)
 
         db.session.commit()
+        daily_occupancy.rebuild()
         print("Database seeded successfully!")
 
+def bulk_insert(table, rows):
+    """Insert ``rows`` (an iterable of dicts) with executemany batches."""
+    rows = iter(rows)
+    count = 0
+    while True:
+        batch = list(islice(rows, INSERT_BATCH))
+        if not batch:
+            return count
+        db.session.execute(insert(table), batch)
+        count += len(batch)
+
+def generate_rooms(rng, count):
+    types = list(ROOM_TYPES)
+    weights = [ROOM_TYPES[t][2] for t in types]
+    per_floor = 50
+    for i in range(count):
+        room_type = rng.choices(types, weights)[0]
+        price, capacity, _, _ = ROOM_TYPES[room_type]
+        yield {
+            'id': i + 1,
+            'room_number': str((i // per_floor + 1) * 100 + i % per_floor + 1),
+            'room_type': room_type,
+            'price': price,
+            'capacity': capacity,
+            'status': 'maintenance' if rng.random() < 0.02 else 'available',
+        }
+
+def generate_room_amenities(rng, rooms):
+    for room in rooms:
+        chance = ROOM_TYPES[room['room_type']][3]
+        yield {'room_id': room['id'], 'amenity_id': 1}  # Every room has WiFi
+        for amenity_id in range(2, len(AMENITIES) + 1):
+            if rng.random() < chance:
+                yield {'room_id': room['id'], 'amenity_id': amenity_id}
+
+def generate_guests(fake, rng, count):
+    # Faker is slow per call, so draw pools once and combine them.
+    first_names = [fake.first_name() for _ in range(500)]
+    last_names = [fake.last_name() for _ in range(500)]
+    domains = [fake.free_email_domain() for _ in range(20)]
+    id_types = ["Passport", "Driver's License", "National ID"]
+    for i in range(1, count + 1):
+        first, last = rng.choice(first_names), rng.choice(last_names)
+        yield {
+            'id': i,
+            'name': f'{first} {last}',
+            'email': f'{first.lower()}.{last.lower()}{i}@{rng.choice(domains)}',
+            'phone': f'555-{rng.randrange(10000):04d}',
+            'address': None,
+            'id_type': rng.choice(id_types),
+            'id_number': f'{rng.choice("ABCDEFGH")}{rng.randrange(10 ** 8):08d}',
+        }
+
+def generate_reservations(rng, rooms, guests, count, start, days, today):
+    """Yield ``count`` non-overlapping stays spread evenly over the rooms.
+
+    Each room's window of ``days`` nights is cut into one slot per booking
+    and every stay sits inside its own slot, so stays never overlap.
+    """
+    requests = [None, None, None, "Late check-out", "High floor preferred", "Extra pillows"]
+    base, extra = divmod(count, rooms)
+    ident = 0
+    for room_id in range(1, rooms + 1):
+        quota = min(base + (room_id <= extra), days)
+        for slot in range(quota):
+            first, last = slot * days // quota, (slot + 1) * days // quota
+            nights = rng.randint(1, min(7, last - first))
+            offset = rng.randint(first, last - nights)
+            check_in = start + timedelta(days=offset)
+            check_out = check_in + timedelta(days=nights)
+            if check_out.date() <= today:
+                status = 'cancelled' if rng.random() < 0.05 else 'checked-out'
+            elif check_in.date() <= today:
+                status = 'checked-in'
+            else:
+                status = 'confirmed'
+            ident += 1
+            yield {
+                'id': ident,
+                'guest_id': rng.randint(1, guests),
+                'room_id': room_id,
+                'check_in_date': check_in,
+                'check_out_date': check_out,
+                'status': status,
+                'special_requests': rng.choice(requests),
+            }
+
+def seed_scaled(rooms, guests, reservations, years, seed):
+    """Seed a production-sized, deterministic data set with bulk inserts."""
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    today = datetime.now().date()
+    # History runs back ``years`` and bookings extend 180 days ahead.
+    days = int(years * 365)
+    start = datetime.combine(today - timedelta(days=days - 180), datetime.min.time())
+    if reservations > rooms * days:
+        print(f"Capping reservations at {rooms * days} (one night per room per day)")
+        reservations = rooms * days
+
+    with app.app_context():
+        clear_data()
+        if db.engine.dialect.name == 'sqlite':
+            # Safe for a throwaway load; the database is rebuilt on failure anyway.
+            db.session.execute(text('PRAGMA synchronous = OFF'))
+        began = time.perf_counter()
+
+        print("Creating staff and amenities...")
+        db.session.add_all([
+            Staff(name="Admin User", position="Manager", email="admin@hotel.com",
+                  password_hash=generate_password_hash("admin123"), is_admin=True),
+            Staff(name="Reception Staff", position="Receptionist", email="reception@hotel.com",
+                  password_hash=generate_password_hash("reception123"), is_admin=False),
+        ])
+        bulk_insert(Amenity.__table__, (
+            {'id': i, 'name': name, 'description': description}
+            for i, (name, description) in enumerate(AMENITIES, start=1)
+        ))
+
+        print(f"Creating {rooms} rooms...")
+        room_rows = list(generate_rooms(rng, rooms))
+        bulk_insert(Room.__table__, room_rows)
+        links = bulk_insert(room_amenities, generate_room_amenities(rng, room_rows))
+        print(f"Assigned {links} room amenities")
+
+        print(f"Creating {guests} guests...")
+        bulk_insert(Guest.__table__, generate_guests(fake, rng, guests))
+
+        print(f"Creating {reservations} reservations over {years} years...")
+        bulk_insert(Reservation.__table__, generate_reservations(
+            rng, rooms, guests, reservations, start, days, today))
+
+        if db.engine.dialect.name == 'postgresql':
+            # Explicit ids don't advance serial sequences; move them past the new rows.
+            for table in ('amenities', 'rooms', 'guests', 'reservations'):
+                db.session.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1)) FROM {table}"
+                ))
+
+        db.session.commit()
+        print(f"Summarizing daily occupancy ({daily_occupancy.rebuild()} rows)...")
+        print(f"Database seeded in {time.perf_counter() - began:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the hotel database.")
+    parser.add_argument('--rooms', type=int, help="generate this many rooms (enables bulk mode)")
+    parser.add_argument('--guests', type=int, default=1000)
+    parser.add_argument('--reservations', type=int, default=10000)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.rooms is None:
+        seed_data()
+    else:
+        seed_scaled(args.rooms, args.guests, args.reservations, args.years, args.seed)
+
 if __name__ == '__main__':
-    seed_data()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,255 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from itertools import islice
+from json.encoder import encode_basestring_ascii
+from operator import itemgetter
+from flask import current_app, stream_with_context
+from sqlalchemy import select
+from config import db
+from instrumentation import serialization_timer
+from models import Guest, Room, Reservation, Amenity, Staff, room_amenities
+from loading import GUEST_FIELDS, ROOM_FIELDS, RESERVATION_FIELDS, AMENITY_FIELDS
+
+STAFF_FIELDS = ('id', 'name', 'position', 'email', 'is_admin')
+
+# Rows are rendered and related rows fetched this many parents at a time, which
+# also keeps the IN (...) lists under SQLite's bound parameter limit.
+BATCH_SIZE = 500
+
+
+def _encoder(model, column):
+    """Compile the JSON encoder for one column, mirroring SerializerMixin."""
+    python_type = column.type.python_type
+    if python_type is bool:
+        encode = lambda v: 'true' if v else 'false'
+    elif python_type is int:
+        encode = int.__repr__
+    elif python_type is float:
+        encode = float.__repr__
+    elif python_type is str:
+        encode = encode_basestring_ascii
+    elif python_type is datetime:
+        fmt = model.datetime_format
+        encode = lambda v: '"' + v.strftime(fmt) + '"'
+    elif python_type is date:
+        fmt = model.date_format
+        encode = lambda v: '"' + v.strftime(fmt) + '"'
+    elif python_type is time:
+        fmt = model.time_format
+        encode = lambda v: '"' + v.strftime(fmt) + '"'
+    elif python_type is Decimal:
+        fmt = model.decimal_format
+        encode = lambda v: encode_basestring_ascii(fmt.format(v))
+    else:
+        raise TypeError(f'Cannot compile a JSON encoder for {column}')
+    return lambda v: 'null' if v is None else encode(v)
+
+
+class Relation:
+    """A relationship a ``RowSerializer`` can expand.
+
+    ``key`` is the foreign key column: on the parent table for a many-to-one
+    relation, on the related table for a one-to-many relation, or on
+    ``secondary`` for a many-to-many relation. ``expand`` names the
+    relations of the related serializer rendered inside it.
+    """
+
+    def __init__(self, serializer, key, many=False, secondary=None, expand=()):
+        self.serializer = serializer
+        self.key = key
+        self.many = many
+        self.secondary = secondary
+        self.expand = frozenset(expand)
+
+
+class RowSerializer:
+    """Render JSON for a model straight from Core result rows.
+
+    Produces the same bytes as ``jsonify([obj.to_dict() ...])``, with keys
+    sorted and the app's ``compact`` setting respected, but without building
+    ORM objects or dicts. The field plan for each ``expand`` set and layout is
+    compiled once into a ``%`` template and per-column encoders; related rows
+    are fetched with one IN query per relation per batch.
+
+    Rows must come from ``select(model.__table__)`` (see ``statement``).
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.table = model.__table__
+        self.fields = fields
+        self.relations = {}
+        self._plans = {}
+
+    def statement(self):
+        return select(self.table)
+
+    def tables(self, expand=None):
+        """Names of every table read when rendering with ``expand``."""
+        if expand is None:
+            expand = frozenset(self.relations)
+        names = {self.table.name}
+        for name in expand:
+            relation = self.relations[name]
+            if relation.secondary is not None:
+                names.add(relation.secondary.name)
+            names |= relation.serializer.tables(relation.expand)
+        return frozenset(names)
+
+    def plan(self, expand, depth, pretty):
+        if expand is None:
+            expand = frozenset(self.relations)
+        key = (expand, depth, pretty)
+        if key not in self._plans:
+            self._plans[key] = _Plan(self, expand, depth, pretty)
+        return self._plans[key]
+
+    def iter_json(self, rows, expand=None):
+        """Yield the JSON array for ``rows`` in chunks of ``BATCH_SIZE`` rows."""
+        pretty = current_app.json.compact is False
+        plan = self.plan(expand, 1, pretty)
+        sep = ',\n  ' if pretty else ','
+        prefix = '[\n  ' if pretty else '['
+        for batch in _batches(rows):
+            with serialization_timer():
+                chunk = prefix + sep.join(plan.render(batch))
+            yield chunk
+            prefix = sep
+        yield '[]\n' if prefix != sep else ('\n]\n' if pretty else ']\n')
+
+    def iter_ndjson(self, rows, expand=None):
+        """Yield one compact JSON object per line, ``BATCH_SIZE`` rows at a time."""
+        plan = self.plan(expand, 0, False)
+        for batch in _batches(rows):
+            with serialization_timer():
+                chunk = '\n'.join(plan.render(batch)) + '\n'
+            yield chunk
+
+    def dumps(self, rows, expand=None):
+        return ''.join(self.iter_json(rows, expand))
+
+    def response(self, rows, expand=None, status=200, headers=None, ndjson=False):
+        if ndjson:
+            body, mimetype = self.iter_ndjson(rows, expand), 'application/x-ndjson'
+        else:
+            body, mimetype = self.iter_json(rows, expand), current_app.json.mimetype
+        return current_app.response_class(
+            stream_with_context(body),
+            status=status,
+            headers=headers,
+            mimetype=mimetype,
+        )
+
+
+def _batches(rows):
+    iterator = iter(rows)
+    try:
+        while True:
+            batch = list(islice(iterator, BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
+    finally:
+        # Release a streamed cursor even if the client disconnects early.
+        close = getattr(rows, 'close', None)
+        if close is not None:
+            close()
+
+
+class _Plan:
+    def __init__(self, serializer, expand, depth, pretty):
+        unknown = expand - set(serializer.relations)
+        if unknown:
+            raise ValueError(f'Cannot expand {", ".join(sorted(unknown))}')
+        self.depth = depth
+        self.pretty = pretty
+        columns = list(serializer.table.c.keys())
+        self.positions = {name: i for i, name in enumerate(columns)}
+
+        slots = {}
+        for name in serializer.fields:
+            column = serializer.table.c[name]
+            slots[name] = (self.positions[name], _encoder(serializer.model, column))
+        self.relations = []
+        for name in expand:
+            relation = serializer.relations[name]
+            child_depth = depth + 2 if relation.many else depth + 1
+            child = relation.serializer.plan(relation.expand, child_depth, pretty)
+            slots[name] = len(self.relations)
+            self.relations.append((relation, child))
+
+        self.slots = [slots[name] for name in sorted(slots)]
+        if pretty:
+            indent = '  ' * (depth + 1)
+            body = ',\n'.join(f'{indent}{encode_basestring_ascii(k)}: %s' for k in sorted(slots))
+            self.template = '{\n' + body + '\n' + '  ' * depth + '}'
+        else:
+            self.template = '{' + ','.join(f'{encode_basestring_ascii(k)}:%s' for k in sorted(slots)) + '}'
+
+    def _list(self, items, depth):
+        if not items:
+            return '[]'
+        if not self.pretty:
+            return '[' + ','.join(items) + ']'
+        indent = '  ' * depth
+        return '[\n' + indent + (',\n' + indent).join(items) + '\n' + '  ' * (depth - 1) + ']'
+
+    def _fetch(self, relation, child, rows):
+        """Render the related rows for ``rows`` and return a row -> JSON lookup."""
+        target = relation.serializer.table
+        if not relation.many:
+            local = self.positions[relation.key.key]
+            keys = {row[local] for row in rows} - {None}
+            found = db.session.execute(select(target).where(target.c.id.in_(keys))).all() if keys else []
+            ident = child.positions['id']
+            rendered = dict(zip((r[ident] for r in found), child.render(found)))
+            return lambda row: rendered.get(row[local], 'null')
+
+        parent = self.positions['id']
+        ids = {row[parent] for row in rows}
+        if relation.secondary is not None:
+            other = next(c for c in relation.secondary.c if c is not relation.key)
+            query = (
+                select(target, relation.key)
+                .join(relation.secondary, other == target.c.id)
+                .where(relation.key.in_(ids))
+            )
+            group = itemgetter(-1)
+        else:
+            query = select(target).where(relation.key.in_(ids))
+            group = itemgetter(list(target.c).index(relation.key))
+        found = db.session.execute(query.order_by(target.c.id)).all()
+        grouped = {}
+        for row, text in zip(found, child.render(found)):
+            grouped.setdefault(group(row), []).append(text)
+        depth = child.depth
+        return lambda row: self._list(grouped.get(row[parent]), depth)
+
+    def render(self, rows):
+        lookups = [self._fetch(relation, child, rows) for relation, child in self.relations]
+        slots = [
+            (lambda row, p=slot[0], encode=slot[1]: encode(row[p])) if isinstance(slot, tuple)
+            else lookups[slot]
+            for slot in self.slots
+        ]
+        template = self.template
+        return [template % tuple([slot(row) for slot in slots]) for row in rows]
+
+
+guest_serializer = RowSerializer(Guest, GUEST_FIELDS)
+room_serializer = RowSerializer(Room, ROOM_FIELDS)
+reservation_serializer = RowSerializer(Reservation, RESERVATION_FIELDS)
+amenity_serializer = RowSerializer(Amenity, AMENITY_FIELDS)
+staff_serializer = RowSerializer(Staff, STAFF_FIELDS)
+
+# Same shapes as the loading profiles (and the default to_dict() output).
+guest_serializer.relations['reservations'] = Relation(
+    reservation_serializer, Reservation.__table__.c.guest_id, many=True, expand=('room',))
+room_serializer.relations['amenities'] = Relation(
+    amenity_serializer, room_amenities.c.room_id, many=True, secondary=room_amenities)
+room_serializer.relations['reservations'] = Relation(
+    reservation_serializer, Reservation.__table__.c.room_id, many=True, expand=('guest',))
+reservation_serializer.relations['guest'] = Relation(
+    guest_serializer, Reservation.__table__.c.guest_id, expand=())
+reservation_serializer.relations['room'] = Relation(
+    room_serializer, Reservation.__table__.c.room_id, expand=('amenities',))
@@ -0,0 +1,246 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, delete, exists, func, literal_column, select, update
+from config import db
+from models import Room, Reservation, ChangeLog, SweepRun
+from booking import begin_write
+from changes import change_feed
+from daily_occupancy import record_stays
+
+# A breather between batches, so request writers get the SQLite write lock in
+# between rather than queueing behind a whole sweep.
+BATCH_PAUSE = 0.05
+TICK = 1.0
+
+reservations = Reservation.__table__
+rooms = Room.__table__
+change_log = ChangeLog.__table__
+sweep_runs = SweepRun.__table__
+
+
+def _status(value):
+    # Inlined rather than bound, so SQLite can match the partial indexes.
+    return literal_column(f"'{value}'")
+
+
+def _in_batches(statement, batch_size, after=None):
+    """Run ``statement(batch_size)`` in short write transactions until it touches fewer rows.
+
+    ``statement`` must pick at most ``batch_size`` rows itself (an
+    ``id IN (SELECT ... LIMIT n)``), so no transaction holds the write lock
+    for longer than one batch. ``after`` gets each batch's RETURNING rows
+    inside its transaction. Returns ``(rows, batches)``.
+    """
+    total = batches = 0
+    while True:
+        begin_write()
+        try:
+            result = db.session.execute(statement(batch_size))
+            if result.returns_rows:
+                rows = result.all()
+                count = len(rows)
+                if after is not None and rows:
+                    after(rows)
+            else:
+                count = result.rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        total += count
+        batches += 1
+        if count < batch_size:
+            return total, batches
+        time.sleep(BATCH_PAUSE)
+
+
+def _set_status(table, where, status, batch_size, after=None):
+    def statement(limit):
+        picked = select(table.c.id).where(where).limit(limit)
+        # ``where`` again on the UPDATE itself, so a row someone else changed
+        # after it was picked is left alone. The version moves on, so edits
+        # made against the old status conflict instead of overwriting it.
+        return (
+            update(table)
+            .where(table.c.id.in_(picked), where)
+            .values(status=status, version=table.c.version + 1)
+            .returning(*table.c)
+        )
+    return _in_batches(statement, batch_size, after)
+
+
+def _log(model):
+    return lambda rows: change_feed.record_rows(db.session, model, 'update', rows)
+
+
+def check_out_departed(now, config, batch_size):
+    """'checked-in' stays whose check-out date passed CHECKOUT_GRACE_HOURS ago become 'checked-out'."""
+    cutoff = now - timedelta(hours=config['CHECKOUT_GRACE_HOURS'])
+    where = and_(reservations.c.status == _status('checked-in'), reservations.c.check_out_date < cutoff)
+    # Both statuses earn revenue, so daily_occupancy is unaffected.
+    return _set_status(reservations, where, 'checked-out', batch_size, _log(Reservation))
+
+
+def expire_no_shows(now, config, batch_size):
+    """'confirmed' stays whose check-in date passed NO_SHOW_GRACE_HOURS ago become 'no-show'."""
+    cutoff = now - timedelta(hours=config['NO_SHOW_GRACE_HOURS'])
+    where = and_(reservations.c.status == _status('confirmed'), reservations.c.check_in_date < cutoff)
+
+    def after(rows):
+        # No longer revenue: take the stays, as they were, back out of the summary.
+        stays = [dict(row._mapping, status='confirmed') for row in rows]
+        record_stays(db.session.connection(), stays, sign=-1)
+        change_feed.record_rows(db.session, Reservation, 'update', rows)
+
+    return _set_status(reservations, where, 'no-show', batch_size, after)
+
+
+def release_rooms(now, config, batch_size):
+    """'occupied' rooms with nobody checked in become 'available' again.
+
+    Only in that direction: search and availability already see who is in a
+    room from its stays, and an in-house guest must not hide the room from
+    future bookings.
+    """
+    in_house = exists().where(reservations.c.room_id == rooms.c.id, reservations.c.status == _status('checked-in'))
+    where = and_(rooms.c.status == _status('occupied'), ~in_house)
+    return _set_status(rooms, where, 'available', batch_size, _log(Room))
+
+
+def prune_history(now, config, batch_size):
+    """Delete change log entries and sweep runs past their retention."""
+    change_cutoff = now - timedelta(days=config['CHANGE_LOG_RETENTION_DAYS'])
+    run_cutoff = now - timedelta(days=config['SWEEP_HISTORY_DAYS'])
+
+    def changes(limit):
+        # Oldest first by id, so the scan stops at the first recent entry. The
+        # newest entry always stays: it is what tells an old cursor from a
+        # current one.
+        newest = select(func.max(change_log.c.id)).scalar_subquery()
+        picked = (
+            select(change_log.c.id)
+            .where(change_log.c.changed_at < change_cutoff, change_log.c.id < newest)
+            .order_by(change_log.c.id)
+            .limit(limit)
+        )
+        return delete(change_log).where(change_log.c.id.in_(picked))
+
+    def runs(limit):
+        picked = select(sweep_runs.c.id).where(sweep_runs.c.started_at < run_cutoff).order_by(sweep_runs.c.id).limit(limit)
+        return delete(sweep_runs).where(sweep_runs.c.id.in_(picked))
+
+    pruned, batches = _in_batches(changes, batch_size)
+    more, more_batches = _in_batches(runs, batch_size)
+    return pruned + more, batches + more_batches
+
+
+SWEEPS = {
+    'check_out_departed': check_out_departed,
+    'expire_no_shows': expire_no_shows,
+    'release_rooms': release_rooms,
+    'prune_history': prune_history,
+}
+
+
+class Scheduler:
+    """Runs the lifecycle sweeps every ``interval`` seconds on a small thread pool.
+
+    It belongs in its own process (``flask run-sweeps``) rather than in web
+    workers, so sweeps never run inside request handling or once per worker.
+    A sweep never overlaps itself. Every run, failed or not, is recorded in
+    ``sweep_runs`` for /sweeps and passed to ``report``.
+    """
+
+    def __init__(self, app, sweeps=SWEEPS, report=None):
+        self.app = app
+        self.sweeps = dict(sweeps)
+        self.report = report
+        self.interval = app.config['SWEEP_INTERVAL']
+        self.batch_size = app.config['SWEEP_BATCH_SIZE']
+        self.workers = app.config['SWEEP_WORKERS']
+
+    def run_sweep(self, name):
+        with self.app.app_context():
+            started = datetime.now()
+            clock = time.perf_counter()
+            rows = batches = 0
+            error = None
+            try:
+                rows, batches = self.sweeps[name](started, self.app.config, self.batch_size)
+            except Exception as e:
+                db.session.rollback()
+                error = f'{type(e).__name__}: {e}'[:500]
+                self.app.logger.exception('Sweep %s failed', name)
+            run = SweepRun(
+                sweep=name,
+                started_at=started,
+                duration_ms=round((time.perf_counter() - clock) * 1000, 2),
+                rows=rows,
+                batches=batches,
+                error=error,
+            )
+            db.session.add(run)
+            db.session.commit()
+            result = run_summary(run)
+        if self.report is not None:
+            self.report(result)
+        return result
+
+    def run_once(self):
+        return [self.run_sweep(name) for name in self.sweeps]
+
+    def run(self, stop=None):
+        """Run until ``stop`` (a ``threading.Event``) is set."""
+        stop = stop or threading.Event()
+        due = dict.fromkeys(self.sweeps, 0.0)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sweep') as pool:
+            while not stop.is_set():
+                now = time.monotonic()
+                for name in self.sweeps:
+                    if due[name] <= now and (name not in running or running[name].done()):
+                        due[name] = now + self.interval
+                        running[name] = pool.submit(self.run_sweep, name)
+                stop.wait(TICK)
+
+
+def run_summary(run):
+    return {
+        'sweep': run.sweep,
+        'started_at': run.started_at.isoformat(),
+        'duration_ms': run.duration_ms,
+        'rows': run.rows,
+        'batches': run.batches,
+        'error': run.error,
+    }
+
+
+def sweep_stats():
+    """Per sweep: totals over the retained history and the latest run."""
+    totals = db.session.execute(
+        select(
+            SweepRun.sweep,
+            func.count(),
+            func.sum(case((SweepRun.error.isnot(None), 1), else_=0)),
+            func.sum(SweepRun.rows),
+            func.avg(SweepRun.duration_ms),
+            func.max(SweepRun.duration_ms),
+            func.max(SweepRun.id),
+        ).group_by(SweepRun.sweep)
+    ).all()
+    latest = {run.id: run for run in SweepRun.query.filter(SweepRun.id.in_([row[-1] for row in totals]))}
+    return [
+        {
+            'sweep': sweep,
+            # SUM() and AVG() come back as Decimal on Postgres.
+            'runs': runs,
+            'failures': int(failures or 0),
+            'rows': int(rows or 0),
+            'avg_ms': round(float(avg_ms), 2),
+            'max_ms': max_ms,
+            'last_run': run_summary(latest[last_id]),
+        }
+        for sweep, runs, failures, rows, avg_ms, max_ms, last_id in sorted(totals)
+    ]
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# config.py reads the environment at import, so point it at a scratch
+# database before the app is loaded. The response cache is off so one test
+# never sees another's responses.
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ.setdefault('SECRET_KEY', 'test')
+os.environ['RESPONSE_CACHE_TTL'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app  # noqa: E402
+from config import db  # noqa: E402
+
+with app.app_context():
+    db.create_all()
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        yield app.test_client()
+        db.session.rollback()
+        # Emptying the tables (rather than dropping them) keeps the guest
+        # search index and its triggers in place.
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
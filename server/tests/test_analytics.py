@@ -0,0 +1,12 @@
+def test_revenue_report_from_leap_day_defaults_to_a_year(client):
+    response = client.get('/analytics/revenue?start=2024-02-29')
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert (report['start'], report['end']) == ('2024-02-29', '2025-02-28')
+
+
+def test_revenue_report_rejects_impossible_date(client):
+    response = client.get('/analytics/revenue?start=2023-02-29')
+
+    assert response.status_code == 400
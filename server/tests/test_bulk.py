@@ -0,0 +1,22 @@
+from models import Guest
+
+
+def guest(n, **fields):
+    record = {'name': f'Guest {n}', 'email': f'guest{n}@example.com', 'phone': '555-0100', 'idType': 'Passport', 'idNumber': str(n)}
+    record.update(fields)
+    return record
+
+
+def test_guest_import_reports_non_string_fields_per_row(client):
+    records = [guest(0), guest(1, email=5), guest(2, idNumber=None, address=['x']), guest(3)]
+
+    response = client.post('/guests/bulk', json=records)
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['created'] == 2
+    assert body['errors'] == [
+        {'index': 1, 'error': 'Fields must be strings: email'},
+        {'index': 2, 'error': 'Fields must be strings: idNumber, address'},
+    ]
+    assert sorted(g.email for g in Guest.query) == ['guest0@example.com', 'guest3@example.com']
@@ -0,0 +1,20 @@
+from config import db
+from models import Guest
+
+
+def add_guest(name, email, phone='555-0100'):
+    db.session.add(Guest(name=name, email=email, phone=phone, id_type='Passport', id_number=email))
+
+
+def test_whole_word_matches_come_before_older_prefix_matches(client):
+    for n in range(12):
+        add_guest(f'Ann Smithson {n}', f'ann.smithson{n}@example.com')
+    add_guest('Ann Smith', 'ann.smith@example.com')
+    db.session.commit()
+
+    names = [g['name'] for g in client.get('/guests/search?q=smith&limit=5').get_json()]
+    assert names == ['Ann Smith', 'Ann Smithson 0', 'Ann Smithson 1', 'Ann Smithson 2', 'Ann Smithson 3']
+
+    # Too short to rank: prefix matches in id order.
+    names = [g['name'] for g in client.get('/guests/search?q=ann&limit=2').get_json()]
+    assert names == ['Ann Smithson 0', 'Ann Smithson 1']
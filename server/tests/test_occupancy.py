@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from config import db
+from models import Guest, Room, Reservation
+
+
+def book(room, guest, check_in, check_out):
+    reservation = Reservation(
+        room=room, guest=guest,
+        check_in_date=datetime.fromisoformat(check_in),
+        check_out_date=datetime.fromisoformat(check_out),
+    )
+    db.session.add(reservation)
+    return reservation
+
+
+def test_calendar_skips_stay_checking_out_on_first_day(client):
+    room = Room(room_number='101', room_type='Standard', price=99.99, capacity=2)
+    guest = Guest(name='Ada', email='ada@example.com', phone='555-0100', id_type='Passport', id_number='A1')
+    book(room, guest, '2030-01-03', '2030-01-05')
+    staying = book(room, guest, '2030-01-05', '2030-01-07')
+    db.session.commit()
+
+    calendar = client.get('/rooms/calendar?start=2030-01-05&days=3').get_json()
+
+    assert [res['id'] for res in calendar['reservations']] == [staying.id]
+    assert calendar['rooms'][0]['runs'] == [[2, 0], [1, None]]
@@ -0,0 +1,8 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is built when ``config`` is imported; importing ``app`` registers
+every resource on it.
+"""
+from app import app  # noqa: F401